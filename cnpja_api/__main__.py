@@ -0,0 +1,5 @@
+import sys
+
+from cnpja_api.cnpja_cli import main
+
+sys.exit(main())
@@ -0,0 +1,70 @@
+import copy
+import threading
+from concurrent.futures import Future
+
+
+class AgrupadorRequisicoes:
+    """
+    Agrupa requisições idênticas simultâneas ("single-flight"): enquanto uma requisição está em
+    andamento, novas chamadas com a mesma chave aguardam o seu resultado em vez de repetir a
+    requisição e gastar créditos de novo.
+
+    O resultado, ou a exceção, da requisição é entregue a todas as chamadas que a aguardavam.
+    Quando houve espera, cada chamada recebe a sua própria cópia do resultado: alterar a resposta
+    recebida não afeta as demais sessões. Nada é guardado depois da conclusão: chamadas posteriores
+    fazem uma nova requisição (ou são atendidas pelo CacheRespostas, quando configurado).
+    """
+
+    def __init__(self):
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def executar(self, chave, funcao, ao_agrupar=None):
+        """
+        Executa `funcao()` ou, se já houver uma execução em andamento para `chave`, aguarda e
+        retorna o resultado dela (ou relança a mesma exceção).
+
+        Args:
+            chave: Identificação da requisição (hashable)
+            funcao (callable): Faz a requisição
+            ao_agrupar (callable, optional): Chamado quando esta chamada aguarda uma requisição em andamento
+        """
+        with self._lock:
+            voo = self._em_andamento.get(chave)
+            lider = voo is None
+            if lider:
+                voo = Future()
+                voo.aguardando = 0
+                self._em_andamento[chave] = voo
+            else:
+                voo.aguardando += 1
+
+        if not lider:
+            if ao_agrupar:
+                ao_agrupar()
+            # O resultado guardado em `voo` nunca é entregue diretamente: o líder pode alterá-lo
+            return copy.deepcopy(voo.result())
+
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            self._concluir(chave)
+            voo.set_exception(e)
+            raise
+        aguardando = self._concluir(chave)
+        voo.set_result(resultado)
+        return copy.deepcopy(resultado) if aguardando else resultado
+
+    def em_andamento(self) -> int:
+        """Número de requisições distintas em andamento."""
+        with self._lock:
+            return len(self._em_andamento)
+
+    def _concluir(self, chave) -> int:
+        """Remove a requisição das em andamento e retorna quantas chamadas aguardavam por ela."""
+        with self._lock:
+            return self._em_andamento.pop(chave).aguardando
+
+
+# Compartilhado por todos os clientes do processo (ex: sessões do Streamlit e lotes simultâneos)
+agrupador_padrao = AgrupadorRequisicoes()
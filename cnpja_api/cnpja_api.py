@@ -1,11 +1,57 @@
 import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator
+from urllib.parse import quote
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from cnpja_api.cnpja_exceptions import (
+    CNPJaError,
+    CNPJaRateLimitError,
+    CNPJaCreditError,
+    CNPJaNotFoundError,
+    CNPJaAuthError,
+    CNPJaServerError,
+    CNPJaConnectionError,
+)
+from cnpja_api.cnpja_rate_limiter import LimitadorTaxa
+from cnpja_api.cnpja_cache import CacheRespostas
+from cnpja_api.cnpja_metricas import Metricas
+from cnpja_api.cnpja_agrupador import AgrupadorRequisicoes, agrupador_padrao
 
 class CNPJaAPI:
     BASE_URL = "https://api.cnpja.com"
+    # Limites usados para dividir filtros "*.in" longos em várias consultas
+    MAX_ITENS_FILTRO = 50
+    MAX_TAMANHO_FILTRO = 1800
+
+    def __init__(self, api_key: str = None, tamanho_pool: int = 10, timeout: tuple = (5, 30),
+                 max_tentativas: int = 3, backoff_base: float = 1.0, backoff_maximo: float = 30.0,
+                 limitador: LimitadorTaxa = None, cache: CacheRespostas = None, metricas: Metricas = None,
+                 base_url: str = None, agrupador: AgrupadorRequisicoes = None):
+        """
+        Cliente da API CNPJa com sessão HTTP persistente (keep-alive) e novas tentativas automáticas.
+
+        Args:
+            api_key (str, optional): Chave da API. Se omitida, usa a variável de ambiente CNPJA_API_KEY
+            tamanho_pool (int): Número máximo de conexões mantidas abertas com a API
+            timeout (tuple): Tempo limite (conexão, leitura) em segundos para cada requisição
+            max_tentativas (int): Novas tentativas para respostas 429, 5xx e falhas de rede
+            backoff_base (float): Espera inicial, em segundos, do backoff exponencial
+            backoff_maximo (float): Espera máxima, em segundos, entre tentativas. Um Retry-After maior
+                não é aguardado: o erro é lançado com o `retry_after` do servidor
+            limitador (LimitadorTaxa, optional): Limitador de taxa aplicado a todas as requisições
+            cache (CacheRespostas, optional): Cache local consultado antes de cada requisição
+            metricas (Metricas, optional): Recebe latência, erros, novas tentativas e acertos de cache
+            base_url (str, optional): Endereço da API. Padrão: BASE_URL (ex: servidor simulado em benchmarks)
+            agrupador (AgrupadorRequisicoes, optional): Agrupa requisições idênticas simultâneas.
+                Padrão: agrupador_padrao, compartilhado por todos os clientes do processo
+        """
 
-    def __init__(self, api_key: str = None):
-        
         if api_key:
             self.api_key = api_key
         elif os.getenv("CNPJA_API_KEY"):
@@ -18,9 +64,76 @@ class CNPJaAPI:
             "Content-Type": "application/json"
         }
 
-    def consultar_cnpj(self, cnpj: str) -> dict:
+        if base_url:
+            self.BASE_URL = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_maximo = backoff_maximo
+        self.limitador = limitador
+        self.cache = cache
+        self.metricas = metricas
+        self.agrupador = agrupador or agrupador_padrao
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.tamanho_pool = 0
+        self._pool_lock = threading.Lock()
+        self.ajustar_pool(tamanho_pool)
+
+    def ajustar_pool(self, tamanho_pool: int) -> None:
+        """
+        Garante ao menos `tamanho_pool` conexões reaproveitáveis com a API (ex: um lote com mais CNPJs
+        simultâneos que o pool atual). Com um pool menor, as conexões excedentes seriam descartadas
+        a cada requisição e refeitas, com um novo handshake TCP/TLS.
+        """
+        with self._pool_lock:
+            if tamanho_pool <= self.tamanho_pool:
+                return
+            # Requisições em andamento terminam no adaptador anterior
+            adapter = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+            self.tamanho_pool = tamanho_pool
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def consultar_cnpj(self, cnpj: str, simples: bool = False, registrations: list[str] = None,
+                       max_age: int = None) -> dict:
+        """
+        Consulta um estabelecimento. Simples Nacional e inscrições estaduais podem vir na mesma
+        requisição, evitando chamadas separadas a consultar_simples e consultar_cadastro_contribuintes.
+
+        Args:
+            cnpj (str): CNPJ do estabelecimento
+            simples (bool): Inclui company.simples e company.simei na resposta
+            registrations (list[str], optional): Estados das inscrições estaduais a incluir (ex: ['SP', 'RJ'])
+            max_age (int, optional): Idade máxima, em dias, dos dados já armazenados pela CNPJa que podem ser
+                devolvidos sem nova consulta às fontes oficiais (parâmetro maxAge da API)
+
+        Returns:
+            dict: Dados do estabelecimento
+        """
         cnpj = self._normalize_taxid(cnpj)
         url = f"{self.BASE_URL}/office/{cnpj}"
+
+        parametros = []
+        if simples:
+            parametros.append("simples=true")
+        if registrations:
+            parametros.append(f"registrations={','.join(registrations)}")
+        if max_age is not None:
+            parametros.append(f"maxAge={max_age}")
+        if parametros:
+            url += "?" + "&".join(parametros)
+
         return self._get(url)
 
     def consultar_empresa_por_nome(self, nomes: list[str]) -> dict:
@@ -58,24 +171,174 @@ class CNPJaAPI:
         Returns:
             dict: Dados completos do estabelecimento incluindo inscrições estaduais
         """
-        cnpj = self._normalize_taxid(cnpj)
-        
-        # Constrói a URL base
-        url = f"{self.BASE_URL}/office/{cnpj}"
-        
-        # Adiciona parâmetros de registrations se fornecidos
-        if registrations:
-            registrations_param = ",".join(registrations)
-            url += f"?registrations={registrations_param}"
-        
-        return self._get(url)
+        return self.consultar_cnpj(cnpj, registrations=registrations)
+
+    def buscar_empresas_por_nome(self, nomes: Iterable[str], limite_pagina: int = 100) -> Iterator[dict]:
+        """
+        Busca estabelecimentos pelo nome da empresa, retornando um registro por vez.
+
+        Listas grandes são divididas em várias consultas (MAX_ITENS_FILTRO/MAX_TAMANHO_FILTRO) e
+        todas as páginas de cada consulta são percorridas pelo token "next" da resposta.
+
+        Args:
+            nomes (Iterable[str]): Nomes de empresas (pode ser um gerador)
+            limite_pagina (int): Registros por página
+
+        Yields:
+            dict: Estabelecimento, no mesmo formato de consultar_cnpj
+        """
+        for pagina in self._paginas("/office", "company.name.in", nomes, limite_pagina):
+            yield from pagina
+
+    def buscar_cpfs(self, cpfs: Iterable[str], limite_pagina: int = 100) -> Iterator[dict]:
+        """
+        Busca pessoas por CPF, retornando um registro por vez.
+        Divide e pagina as consultas como buscar_empresas_por_nome.
+        """
+        cpfs = (self._normalize_taxid(cpf) for cpf in cpfs)
+        for pagina in self._paginas("/person", "taxId.in", cpfs, limite_pagina):
+            yield from pagina
+
+    def _paginas(self, caminho: str, filtro: str, valores: Iterable[str], limite_pagina: int) -> Iterator[list]:
+        for grupo in self._dividir_filtro(valores):
+            url_base = f"{self.BASE_URL}{caminho}?{filtro}={grupo}&limit={limite_pagina}"
+            token = None
+            while True:
+                url = f"{url_base}&token={quote(token, safe='')}" if token else url_base
+                resposta = self._get(url)
+                yield resposta.get("records", [])
+                token = resposta.get("next")
+                if not token:
+                    break
+
+    def _dividir_filtro(self, valores: Iterable[str]) -> Iterator[str]:
+        """Agrupa os valores em filtros "a,b,c" já codificados para URL, respeitando os limites da classe."""
+        grupo = []
+        tamanho = 0
+        for valor in valores:
+            codificado = quote(str(valor).strip(), safe="")
+            if grupo and (len(grupo) >= self.MAX_ITENS_FILTRO or tamanho + len(codificado) + 1 > self.MAX_TAMANHO_FILTRO):
+                yield ",".join(grupo)
+                grupo = []
+                tamanho = 0
+            grupo.append(codificado)
+            tamanho += len(codificado) + 1
+        if grupo:
+            yield ",".join(grupo)
 
     def _get(self, url: str) -> dict:
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            return response.json()
+        if self.cache:
+            dados = self.cache.obter(url)
+            if self.metricas and self.cache.chave(url) is not None:
+                self.metricas.registrar_cache(url, dados is not None)
+            if dados is not None:
+                return dados
+
+        # Chamadas simultâneas à mesma URL com a mesma chave (ex: duas sessões ou dois lotes consultando
+        # o mesmo CNPJ) aguardam uma única requisição e recebem o mesmo resultado ou a mesma exceção
+        ao_agrupar = (lambda: self.metricas.registrar_agrupada(url)) if self.metricas else None
+        return self.agrupador.executar((self.api_key, url), lambda: self._requisitar_e_armazenar(url), ao_agrupar)
+
+    def _requisitar_e_armazenar(self, url: str) -> dict:
+        dados = self._requisitar(url)
+        if self.cache:
+            self.cache.salvar(url, dados)
+        return dados
+
+    def _requisitar(self, url: str) -> dict:
+        tentativa = 0
+        while True:
+            if self.limitador:
+                inicio_espera = time.monotonic()
+                self.limitador.adquirir()
+                if self.metricas:
+                    self.metricas.registrar_espera_limitador(time.monotonic() - inicio_espera)
+            # A latência medida exclui a espera no limitador
+            inicio = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError) as e:
+                # Os dois últimos: conexão keep-alive encerrada no meio do corpo da resposta
+                erro = CNPJaConnectionError(mensagem=f"Falha de conexão: {e}")
+            else:
+                if response.status_code == 200:
+                    try:
+                        dados = response.json()
+                    except ValueError:
+                        # Ex: página de erro HTML de um proxy no caminho
+                        erro = CNPJaServerError(200, f"Resposta inválida (não é JSON): {response.text[:200]}")
+                    else:
+                        if self.limitador:
+                            self.limitador.registrar_sucesso()
+                        if self.metricas:
+                            self.metricas.registrar_requisicao(url, time.monotonic() - inicio, 200)
+                        return dados
+                else:
+                    erro = self._erro_da_resposta(response)
+            if self.metricas:
+                self.metricas.registrar_requisicao(url, time.monotonic() - inicio, erro.status_code, erro)
+
+            # Apenas limite de requisições, falhas do servidor e de rede são transitórios
+            transitorio = isinstance(erro, (CNPJaRateLimitError, CNPJaServerError, CNPJaConnectionError))
+            if not transitorio or tentativa >= self.max_tentativas or self._espera_excessiva(erro):
+                raise erro
+
+            if self.limitador and isinstance(erro, CNPJaRateLimitError):
+                # O limitador passa a segurar esta e as demais requisições até o fim do Retry-After
+                self.limitador.penalizar(erro.retry_after)
+            else:
+                time.sleep(self._tempo_backoff(tentativa, erro.retry_after))
+            if self.metricas:
+                self.metricas.registrar_nova_tentativa(url)
+            tentativa += 1
+
+    def _erro_da_resposta(self, response: requests.Response) -> CNPJaError:
+        status = response.status_code
+        retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+
+        if status == 429:
+            classe = CNPJaRateLimitError
+        elif status == 402:
+            classe = CNPJaCreditError
+        elif status == 404:
+            classe = CNPJaNotFoundError
+        elif status in (401, 403):
+            classe = CNPJaAuthError
+        elif status >= 500:
+            classe = CNPJaServerError
         else:
-            raise Exception(f"Erro {response.status_code}: {response.text}")
+            classe = CNPJaError
+        return classe(status, response.text, retry_after)
+
+    def _tempo_backoff(self, tentativa: int, retry_after: float = None) -> float:
+        """
+        Calcula a espera antes da próxima tentativa.
+        Respeita o Retry-After do servidor; caso contrário usa backoff exponencial com jitter completo.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_maximo)
+        limite = min(self.backoff_maximo, self.backoff_base * (2 ** tentativa))
+        return random.uniform(0, limite)
+
+    def _espera_excessiva(self, erro: CNPJaError) -> bool:
+        """Se o Retry-After pedido passa de backoff_maximo (ex: horas), a thread não fica presa esperando."""
+        return erro.retry_after is not None and erro.retry_after > self.backoff_maximo
+
+    @staticmethod
+    def _parse_retry_after(valor: str) -> float:
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            pass
+        try:
+            # Formato HTTP-date (ex: "Wed, 21 Oct 2015 07:28:00 GMT")
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
 
-    def _normalize_taxid(self, taxid: str) -> str:
+    @staticmethod
+    def _normalize_taxid(taxid: str) -> str:
         return taxid.replace(".", "").replace("/", "").replace("-", "").strip()
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from cnpja_api.cnpja_api import CNPJaAPI
+
+
+class AsyncCNPJaAPI:
+    """
+    Cliente assíncrono (asyncio) da API CNPJa.
+
+    As requisições são feitas pela sessão HTTP do CNPJaAPI subjacente em um pool de threads,
+    de modo que novas tentativas, backoff e erros tipados são compartilhados com o cliente síncrono.
+
+    Args:
+        api (CNPJaAPI, optional): Cliente síncrono a reutilizar. Se omitido, um novo é criado
+        concorrencia (int): Número máximo de requisições simultâneas
+        **kwargs: Parâmetros repassados ao CNPJaAPI quando `api` não é informado
+    """
+
+    def __init__(self, api: CNPJaAPI = None, concorrencia: int = 10, **kwargs):
+        self._api_propria = api is None
+        if api is None:
+            kwargs.setdefault("tamanho_pool", concorrencia)
+            api = CNPJaAPI(**kwargs)
+        # Um cliente recebido pronto pode ter menos conexões que requisições simultâneas
+        api.ajustar_pool(concorrencia)
+        self.api = api
+        self.concorrencia = concorrencia
+        self._executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="cnpja")
+
+    async def consultar_cnpj(self, cnpj: str, simples: bool = False, registrations: list[str] = None,
+                             max_age: int = None) -> dict:
+        return await self._executar(
+            self.api.consultar_cnpj, cnpj, simples=simples, registrations=registrations, max_age=max_age
+        )
+
+    async def consultar_empresa_por_nome(self, nomes: list[str]) -> dict:
+        return await self._executar(self.api.consultar_empresa_por_nome, nomes)
+
+    async def consultar_cpf(self, cpfs: list[str]) -> dict:
+        return await self._executar(self.api.consultar_cpf, cpfs)
+
+    async def consultar_rfb(self, cnpj: str) -> dict:
+        return await self._executar(self.api.consultar_rfb, cnpj)
+
+    async def consultar_simples(self, cnpj: str) -> dict:
+        return await self._executar(self.api.consultar_simples, cnpj)
+
+    async def consultar_saldo(self) -> dict:
+        return await self._executar(self.api.consultar_saldo)
+
+    async def consultar_cadastro_contribuintes(self, cnpj: str, registrations: list[str] = None) -> dict:
+        return await self._executar(self.api.consultar_cadastro_contribuintes, cnpj, registrations=registrations)
+
+    async def buscar_empresas_por_nome(self, nomes, limite_pagina: int = 100):
+        """Versão assíncrona de CNPJaAPI.buscar_empresas_por_nome (async generator)."""
+        async for registro in self._iterar_paginas(self.api._paginas("/office", "company.name.in", nomes, limite_pagina)):
+            yield registro
+
+    async def buscar_cpfs(self, cpfs, limite_pagina: int = 100):
+        """Versão assíncrona de CNPJaAPI.buscar_cpfs (async generator)."""
+        cpfs = (self.api._normalize_taxid(cpf) for cpf in cpfs)
+        async for registro in self._iterar_paginas(self.api._paginas("/person", "taxId.in", cpfs, limite_pagina)):
+            yield registro
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._api_propria:
+            self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _iterar_paginas(self, paginas):
+        # Cada página é buscada no pool de threads; os registros são entregues um a um
+        fim = object()
+        while True:
+            pagina = await self._executar(next, paginas, fim)
+            if pagina is fim:
+                return
+            for registro in pagina:
+                yield registro
+
+    async def _executar(self, funcao, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(funcao, *args, **kwargs))
@@ -0,0 +1,176 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qsl
+
+
+class CacheRespostas:
+    """
+    Cache de respostas da API CNPJa em dois níveis: LRU em memória na frente de um arquivo SQLite.
+
+    As entradas são identificadas pelo endpoint, CNPJ normalizado e demais parâmetros da consulta,
+    de modo que a mesma consulta feita por outro lote (ou outro usuário do app) é atendida
+    localmente, sem gastar créditos. Apenas endpoints presentes em `ttl` são armazenados.
+
+    As respostas são guardadas serializadas (JSON) também na memória: cada acerto devolve um dict
+    novo, e alterá-lo não afeta o cache nem as demais sessões que consultarem a mesma chave.
+
+    Args:
+        caminho (str, optional): Arquivo SQLite. Se omitido, o cache fica apenas em memória
+        ttl (dict, optional): Validade em segundos por endpoint. Padrão: TTL_PADRAO
+        max_memoria (int): Número máximo de respostas mantidas em memória
+        max_disco (int): Número máximo de respostas mantidas no SQLite
+    """
+
+    TTL_PADRAO = {
+        "office": 24 * 3600,
+        "simples": 24 * 3600,
+        "rfb": 24 * 3600,
+    }
+
+    def __init__(self, caminho: str = None, ttl: dict = None, max_memoria: int = 10_000, max_disco: int = 1_000_000):
+        self.caminho = caminho
+        self.ttl = dict(self.TTL_PADRAO if ttl is None else ttl)
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._estatisticas = {
+            "acertos_memoria": 0,
+            "acertos_disco": 0,
+            "faltas": 0,
+            "expirados": 0,
+            "gravacoes": 0,
+            "remocoes": 0,
+        }
+
+        self._conexao = None
+        if caminho:
+            self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS respostas ("
+                " chave TEXT PRIMARY KEY, endpoint TEXT NOT NULL, dados TEXT NOT NULL,"
+                " expira REAL NOT NULL, acessado REAL NOT NULL)"
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acessado ON respostas (acessado)")
+
+    def obter(self, url: str) -> dict:
+        """Retorna a resposta armazenada para a URL ou None se ausente, expirada ou não armazenável."""
+        chave = self.chave(url)
+        if chave is None:
+            return None
+
+        agora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                expira, dados_json = entrada
+                if expira > agora:
+                    self._memoria.move_to_end(chave)
+                    self._estatisticas["acertos_memoria"] += 1
+                    return json.loads(dados_json)
+                del self._memoria[chave]
+                self._estatisticas["expirados"] += 1
+
+            if self._conexao is not None:
+                linha = self._conexao.execute(
+                    "SELECT dados, expira FROM respostas WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is not None:
+                    dados_json, expira = linha
+                    if expira > agora:
+                        self._conexao.execute("UPDATE respostas SET acessado = ? WHERE chave = ?", (agora, chave))
+                        self._guardar_memoria(chave, expira, dados_json)
+                        self._estatisticas["acertos_disco"] += 1
+                        return json.loads(dados_json)
+                    self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                    self._estatisticas["expirados"] += 1
+
+            self._estatisticas["faltas"] += 1
+            return None
+
+    def salvar(self, url: str, dados: dict) -> None:
+        chave = self.chave(url)
+        if chave is None:
+            return
+
+        agora = time.time()
+        endpoint = chave.split(":", 1)[0]
+        expira = agora + self.ttl[endpoint]
+        dados_json = json.dumps(dados, ensure_ascii=False)
+        with self._lock:
+            self._guardar_memoria(chave, expira, dados_json)
+            if self._conexao is not None:
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO respostas (chave, endpoint, dados, expira, acessado) VALUES (?, ?, ?, ?, ?)",
+                    (chave, endpoint, dados_json, expira, agora)
+                )
+                self._estatisticas["gravacoes"] += 1
+                # Verifica o tamanho a cada 1000 gravações para não pagar um COUNT por resposta
+                if self._estatisticas["gravacoes"] % 1000 == 0:
+                    self._remover_excedente_disco()
+
+    def chave(self, url: str) -> str:
+        """
+        Monta a chave da consulta no formato "endpoint:cnpj:parametros", ignorando o host.
+        Retorna None para endpoints que não devem ser armazenados (ex: saldo de créditos).
+        """
+        partes = urlsplit(url)
+        segmentos = [s for s in partes.path.split("/") if s]
+        if not segmentos or segmentos[0] not in self.ttl or self.ttl[segmentos[0]] <= 0:
+            return None
+
+        endpoint = segmentos[0]
+        parametros = parse_qsl(partes.query, keep_blank_values=True)
+        taxid = segmentos[1] if len(segmentos) > 1 else ""
+        if not taxid:
+            taxid = next((valor for nome, valor in parametros if nome == "taxId"), "")
+        if not taxid:
+            # Buscas por filtro (ex: /office?company.name.in=...) não são armazenadas
+            return None
+        parametros = sorted((nome, valor) for nome, valor in parametros if nome != "taxId")
+        consulta = "&".join(f"{nome}={valor}" for nome, valor in parametros)
+        return f"{endpoint}:{taxid}:{consulta}"
+
+    def estatisticas(self) -> dict:
+        """Contadores de acertos, faltas e gravações, além da taxa de acerto e ocupação atual."""
+        with self._lock:
+            estatisticas = dict(self._estatisticas)
+            estatisticas["entradas_memoria"] = len(self._memoria)
+        acertos = estatisticas["acertos_memoria"] + estatisticas["acertos_disco"]
+        consultas = acertos + estatisticas["faltas"]
+        estatisticas["taxa_acerto"] = acertos / consultas if consultas else 0.0
+        return estatisticas
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+            if self._conexao is not None:
+                self._conexao.execute("DELETE FROM respostas")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+    def _guardar_memoria(self, chave: str, expira: float, dados_json: str) -> None:
+        self._memoria[chave] = (expira, dados_json)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _remover_excedente_disco(self) -> None:
+        self._conexao.execute("DELETE FROM respostas WHERE expira <= ?", (time.time(),))
+        total = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        excedente = total - self.max_disco
+        if excedente > 0:
+            self._conexao.execute(
+                "DELETE FROM respostas WHERE chave IN (SELECT chave FROM respostas ORDER BY acessado LIMIT ?)",
+                (excedente,)
+            )
+            self._estatisticas["remocoes"] += excedente
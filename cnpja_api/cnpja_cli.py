@@ -0,0 +1,194 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+from cnpja_api.cnpja_api import CNPJaAPI
+from cnpja_api.cnpja_cache import CacheRespostas
+from cnpja_api.cnpja_exportacao import FORMATOS, ExportadorStreaming
+from cnpja_api.cnpja_lote_consulta import CNPJaLoteConsulta
+from cnpja_api.cnpja_metricas import Metricas
+from cnpja_api.cnpja_pool import CNPJaPoolAPI
+from cnpja_api.cnpja_snapshots import SnapshotsCNPJ
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cnpja_api",
+        description="Consultas em lote à API CNPJa sem interface gráfica (ex: cron ou contêiner).",
+    )
+    parser.add_argument("--api-key", action="append", dest="chaves",
+                        help="Chave da API (repita para distribuir entre várias chaves). Padrão: CNPJA_API_KEY")
+    parser.add_argument("--base-url", help="Endereço da API (ex: servidor simulado em testes de carga)")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    lote = subparsers.add_parser("lote", help="Consulta os CNPJs de um arquivo e exporta os registros REG")
+    lote.add_argument("entrada", help="Arquivo de CNPJs (.csv, .xlsx ou texto, um por linha)")
+    lote.add_argument("-s", "--saida", required=True,
+                      help="Destino: arquivo .xlsx ou diretório (csv/parquet, um arquivo por REG)")
+    lote.add_argument("-f", "--formato", choices=FORMATOS, default="csv")
+    lote.add_argument("-c", "--coluna", help="Coluna com os CNPJs (com cabeçalho). Padrão: primeira coluna, sem cabeçalho")
+    lote.add_argument("--separador", default=",", help="Separador do CSV de entrada")
+    lote.add_argument("--concorrencia", type=int, default=1, help="CNPJs consultados simultaneamente")
+    lote.add_argument("--consultas-por-minuto", type=int, default=10, help="Limite de requisições por minuto de cada chave")
+    lote.add_argument("--simples", action="store_true", help="Inclui Simples Nacional/SIMEI (REG 900)")
+    lote.add_argument("--contribuintes", action="store_true", help="Inclui inscrições estaduais (REG 800)")
+    lote.add_argument("--cache", help="Arquivo SQLite do cache de respostas (compartilhado entre execuções)")
+    lote.add_argument("--diario", help="Diário do lote (.jsonl.gz). Padrão: <saida>.diario.jsonl.gz")
+    lote.add_argument("--retomar", action="store_true",
+                      help="Retoma um lote interrompido: CNPJs já gravados no diário não são consultados de novo")
+    lote.add_argument("--snapshots",
+                      help="Arquivo SQLite com o último retrato de cada CNPJ: ativa a atualização incremental (REG 700)")
+    lote.add_argument("--idade-maxima", type=int, default=30,
+                      help="Com --snapshots, dias em que um retrato é reaproveitado sem nova consulta")
+    lote.add_argument("--metricas", help="Grava as métricas no formato Prometheus neste arquivo durante o lote")
+    lote.add_argument("--intervalo-progresso", type=float, default=10.0, help="Segundos entre mensagens de progresso")
+    lote.add_argument("-q", "--silencioso", action="store_true", help="Não exibe o progresso")
+
+    subparsers.add_parser("saldo", help="Exibe o saldo de créditos da(s) chave(s)")
+    return parser
+
+
+def criar_api(chaves: list, consultas_por_minuto: int = 10, **kwargs) -> CNPJaAPI:
+    """CNPJaAPI para uma chave ou CNPJaPoolAPI para várias; `kwargs` são repassados ao cliente."""
+    chaves = chaves or [os.getenv("CNPJA_API_KEY")]
+    if not chaves[0]:
+        raise ValueError("A chave da API (CNPJA_API_KEY) não foi definida.")
+    if len(chaves) > 1:
+        return CNPJaPoolAPI(chaves, consultas_por_minuto=consultas_por_minuto, **kwargs)
+    return CNPJaAPI(chaves[0], **kwargs)
+
+
+def executar_lote(args) -> int:
+    diario = args.diario or f"{args.saida.rstrip('/').rstrip(os.sep)}.diario.jsonl.gz"
+    if os.path.exists(diario) and not args.retomar:
+        print(f"O diário {diario} já existe. Use --retomar para continuar o lote ou remova o arquivo.", file=sys.stderr)
+        return 2
+
+    cache = CacheRespostas(args.cache) if args.cache else None
+    snapshots = SnapshotsCNPJ(args.snapshots) if args.snapshots else None
+    metricas = Metricas()
+    api = criar_api(
+        args.chaves, args.consultas_por_minuto, base_url=args.base_url, tamanho_pool=max(10, args.concorrencia),
+        cache=cache, metricas=metricas,
+    )
+    consulta = CNPJaLoteConsulta(api, consultas_por_minuto=args.consultas_por_minuto, metricas=metricas)
+
+    # SIGINT/SIGTERM encerram o lote após os CNPJs em andamento, com diário e saída fechados
+    cancelar = threading.Event()
+
+    def interromper(signum, frame):
+        if cancelar.is_set():
+            raise KeyboardInterrupt
+        print("\nInterrompendo após as consultas em andamento (repita para forçar)...", file=sys.stderr)
+        cancelar.set()
+
+    signal.signal(signal.SIGINT, interromper)
+    signal.signal(signal.SIGTERM, interromper)
+
+    inicio = time.monotonic()
+    ultimo_relatorio = 0.0
+
+    def progresso(atual, total, tempo_restante=None):
+        nonlocal ultimo_relatorio
+        agora = time.monotonic()
+        if agora - ultimo_relatorio < args.intervalo_progresso and atual < total:
+            return
+        ultimo_relatorio = agora
+        if args.metricas:
+            gravar_metricas(metricas, args.metricas)
+        if not args.silencioso:
+            restante = f" | restante ~{formatar_duracao(tempo_restante)}" if tempo_restante is not None else ""
+            print(f"{atual:,}/{total:,} CNPJs ({atual / total:.1%}) | {formatar_duracao(agora - inicio)}{restante}",
+                  file=sys.stderr)
+
+    try:
+        with ExportadorStreaming(args.saida, args.formato, colunas=consulta.esquema.colunas) as exportador:
+            consulta.consultar_arquivo(
+                args.entrada,
+                coluna=args.coluna,
+                separador=args.separador,
+                on_progress=progresso,
+                check_cancel=cancelar.is_set,
+                verificar_simples=args.simples,
+                verificar_contribuintes=args.contribuintes,
+                concorrencia=args.concorrencia,
+                diario=diario,
+                exportador=exportador,
+                acumular_resultados=False,
+                snapshots=snapshots,
+                idade_maxima_dias=args.idade_maxima if snapshots is not None else None,
+            )
+    finally:
+        api.close()
+        if cache:
+            cache.close()
+        if snapshots is not None:
+            snapshots.close()
+        if args.metricas:
+            gravar_metricas(metricas, args.metricas)
+
+    if not args.silencioso:
+        imprimir_resumo(metricas, time.monotonic() - inicio)
+    if cancelar.is_set():
+        print(f"Lote interrompido. Execute novamente com --retomar para continuar (diário: {diario}).", file=sys.stderr)
+        return 130
+    return 0
+
+
+def executar_saldo(args) -> int:
+    with criar_api(args.chaves, base_url=args.base_url) as api:
+        saldo = api.consultar_saldo()
+    for chave, valor in saldo.items():
+        if chave != "chaves":
+            print(f"{chave}: {valor}")
+    return 0
+
+
+def gravar_metricas(metricas: Metricas, caminho: str) -> None:
+    # Grava em arquivo temporário e renomeia: coletores (ex: node_exporter) nunca leem um arquivo pela metade
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(metricas.exportar_prometheus())
+    os.replace(temporario, caminho)
+
+
+def imprimir_resumo(metricas: Metricas, duracao: float) -> None:
+    resumo = metricas.resumo()
+    progresso = resumo["progresso"]
+    if progresso:
+        print(f"Concluído: {progresso['concluidos']:,} de {progresso['total']:,} CNPJs em {formatar_duracao(duracao)}",
+              file=sys.stderr)
+    for endpoint, dados in resumo["endpoints"].items():
+        cache = f" | cache {dados['taxa_acerto_cache']:.1%}" if dados["taxa_acerto_cache"] is not None else ""
+        print(f"  /{endpoint}: {dados['requisicoes']:,} requisições | {dados['erros']:,} erros"
+              f" | {dados['novas_tentativas']:,} novas tentativas | ~{dados['creditos_estimados']:,} créditos{cache}",
+              file=sys.stderr)
+
+
+def formatar_duracao(segundos: float) -> str:
+    segundos = int(segundos)
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f"{horas}h{minutos:02d}m{segundos:02d}s" if horas else f"{minutos}m{segundos:02d}s"
+
+
+def main(argv: list = None) -> int:
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    args = criar_parser().parse_args(argv)
+    try:
+        if args.comando == "lote":
+            return executar_lote(args)
+        return executar_saldo(args)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
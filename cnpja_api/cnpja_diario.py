@@ -0,0 +1,191 @@
+import gzip
+import json
+import mmap
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator
+
+
+class DiarioLote:
+    """
+    Diário append-only de um lote: cada linha é um JSON com as respostas brutas da API para um CNPJ,
+    gravado em gzip assim que o CNPJ é concluído.
+
+    Permite retomar um lote interrompido sem repetir as consultas já pagas e reconstruir os
+    registros REG sem acessar a API. Cada abertura acrescenta um novo membro gzip ao arquivo.
+    Uma queda do processo deixa o último membro sem o trailer gzip: na leitura, a linha truncada
+    é ignorada e as demais são aproveitadas; antes de acrescentar, o diário é reescrito apenas com
+    as linhas íntegras, para que o novo membro não fique ilegível atrás do membro truncado.
+
+    Formato de cada linha:
+        {"cnpj": "...", "registrado": "...", "office": {...}, "simples": {...}, "contribuintes": {...}}
+    As chaves "simples"/"contribuintes" só existem quando a consulta foi solicitada; falhas são
+    gravadas como {"erro": "mensagem"}. Se a consulta do CNPJ falhou, há apenas "erro".
+
+    Args:
+        caminho (str): Arquivo do diário (ex: "lote.jsonl.gz")
+    """
+
+    MAGICA_GZIP = b"\x1f\x8b\x08"
+    TAMANHO_BLOCO = 1 << 20
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._arquivo = None
+        self._lock = threading.Lock()
+
+    def registrar(self, cnpj: str, dados: dict = None, dados_simples=None, dados_contribuintes=None,
+                  verificar_simples: bool = False, verificar_contribuintes: bool = False, erro: Exception = None) -> None:
+        """Grava as respostas de um CNPJ. `dados_simples`/`dados_contribuintes` podem ser exceções."""
+        self.gravar(self.entrada(
+            cnpj, dados, dados_simples, dados_contribuintes, verificar_simples, verificar_contribuintes, erro
+        ))
+
+    def gravar(self, entrada: dict) -> None:
+        """Grava uma entrada já montada (ver DiarioLote.entrada)."""
+        linha = json.dumps(entrada, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._arquivo is None:
+                self._reparar()
+                self._arquivo = gzip.open(self.caminho, "at", encoding="utf-8")
+            self._arquivo.write(linha)
+            # flush com Z_SYNC_FLUSH: a linha fica legível mesmo se o processo cair em seguida
+            self._arquivo.flush()
+
+    def ler(self) -> Iterator[dict]:
+        """Percorre as entradas gravadas, na ordem de gravação, ignorando linhas truncadas por quedas."""
+        pendente = b""
+        for bloco in self._descompactar():
+            if bloco is None:
+                # Fim de um membro truncado: o trecho sem quebra de linha é uma gravação parcial
+                pendente = b""
+                continue
+            linhas = (pendente + bloco).split(b"\n")
+            pendente = linhas.pop()
+            for linha in linhas:
+                if not linha.strip():
+                    continue
+                try:
+                    yield json.loads(linha)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+
+    def carregar(self) -> dict:
+        """
+        Retorna a última entrada de cada CNPJ, indexada pelo CNPJ.
+        Uma consulta bem-sucedida nunca é substituída por uma falha posterior.
+        """
+        entradas = {}
+        for entrada in self.ler():
+            anterior = entradas.get(entrada["cnpj"])
+            if anterior is None or "erro" in anterior or "erro" not in entrada:
+                entradas[entrada["cnpj"]] = entrada
+        return entradas
+
+    def concluidos(self) -> set:
+        """CNPJs cuja consulta já foi concluída com sucesso e não precisam ser repetidos."""
+        return {cnpj for cnpj, entrada in self.carregar().items() if "erro" not in entrada}
+
+    @staticmethod
+    def entrada(cnpj: str, dados: dict = None, dados_simples=None, dados_contribuintes=None,
+                verificar_simples: bool = False, verificar_contribuintes: bool = False, erro: Exception = None) -> dict:
+        """Monta a entrada (linha do diário) de um CNPJ, também usada por SnapshotsCNPJ."""
+        entrada = {"cnpj": cnpj, "registrado": datetime.now(timezone.utc).isoformat()}
+        if erro is not None:
+            entrada["erro"] = str(erro)
+        else:
+            entrada["office"] = dados
+            if verificar_simples:
+                entrada["simples"] = DiarioLote._serializar(dados_simples)
+            if verificar_contribuintes:
+                entrada["contribuintes"] = DiarioLote._serializar(dados_contribuintes)
+        return entrada
+
+    @staticmethod
+    def respostas(entrada: dict) -> tuple:
+        """
+        Converte uma entrada de volta nos argumentos de CNPJaLoteConsulta._montar_registros:
+        (dados, dados_simples, dados_contribuintes, verificar_simples, verificar_contribuintes).
+        """
+        return (
+            entrada.get("office"),
+            DiarioLote._desserializar(entrada.get("simples")),
+            DiarioLote._desserializar(entrada.get("contribuintes")),
+            "simples" in entrada,
+            "contribuintes" in entrada,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _descompactar(self) -> Iterator[bytes]:
+        """
+        Conteúdo descompactado do arquivo, membro a membro. Um membro truncado (sem trailer) ou
+        corrompido é lido até o último trecho legível, seguido de None, e a leitura continua no
+        próximo cabeçalho gzip encontrado.
+        """
+        try:
+            arquivo = open(self.caminho, "rb")
+        except FileNotFoundError:
+            return
+        with arquivo:
+            tamanho = os.fstat(arquivo.fileno()).st_size
+            if not tamanho:
+                return
+            with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                inicio = 0
+                while inicio < tamanho:
+                    descompactador = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    posicao = inicio
+                    try:
+                        while not descompactador.eof and posicao < tamanho:
+                            # Os blocos terminam antes de cada possível cabeçalho gzip: se o membro estiver
+                            # truncado, o erro ocorre no bloco seguinte, sem perder o trecho já legível
+                            fim = mapa.find(self.MAGICA_GZIP, posicao + 1, posicao + self.TAMANHO_BLOCO)
+                            if fim < 0:
+                                fim = posicao + self.TAMANHO_BLOCO
+                            bloco = mapa[posicao:fim]
+                            posicao += len(bloco)
+                            yield descompactador.decompress(bloco)
+                    except zlib.error:
+                        pass
+                    if descompactador.eof:
+                        inicio = posicao - len(descompactador.unused_data)
+                        continue
+                    yield None
+                    inicio = mapa.find(self.MAGICA_GZIP, inicio + 1)
+                    if inicio < 0:
+                        return
+
+    def _reparar(self) -> None:
+        """Reescreve o diário só com as linhas íntegras se a gravação anterior foi interrompida."""
+        if not any(bloco is None for bloco in self._descompactar()):
+            return
+        temporario = f"{self.caminho}.tmp"
+        with gzip.open(temporario, "wt", encoding="utf-8") as arquivo:
+            for entrada in self.ler():
+                arquivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        os.replace(temporario, self.caminho)
+
+    @staticmethod
+    def _serializar(resposta):
+        if isinstance(resposta, Exception):
+            return {"erro": str(resposta)}
+        return resposta
+
+    @staticmethod
+    def _desserializar(resposta):
+        if isinstance(resposta, dict) and set(resposta) == {"erro"}:
+            return Exception(resposta["erro"])
+        return resposta
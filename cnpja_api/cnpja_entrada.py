@@ -0,0 +1,164 @@
+import os
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+# Pesos do cálculo dos dígitos verificadores do CNPJ
+PESOS_DV1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_DV2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+
+def normalizar_cnpjs(cnpjs: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de CNPJaAPI._normalize_taxid: remove pontuação e espaços, converte para
+    maiúsculas e completa com zeros à esquerda CNPJs numéricos que perderam os zeros (ex: Excel).
+    """
+    normalizados = cnpjs.astype(str).str.strip().str.upper().str.replace(r"[.\-/\s]", "", regex=True)
+    numericos = normalizados.str.fullmatch(r"\d{1,13}")
+    return normalizados.where(~numericos, normalizados.str.pad(14, side="left", fillchar="0"))
+
+
+def validar_cnpjs(cnpjs: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valida CNPJs já normalizados.
+
+    Returns:
+        tuple: (formato_valido, digitos_validos) — arrays booleanos alinhados à série
+    """
+    tamanho_valido = (cnpjs.str.len() == 14).to_numpy(dtype=bool)
+    formato_valido = np.zeros(len(cnpjs), dtype=bool)
+    digitos_validos = np.zeros(len(cnpjs), dtype=bool)
+    if not tamanho_valido.any():
+        return formato_valido, digitos_validos
+
+    # Cada caractere vale seu código ASCII menos 48: dígitos 0-9 e letras A-Z a partir de 17
+    texto = "".join(cnpjs.to_numpy()[tamanho_valido]).encode("ascii", errors="replace")
+    caracteres = np.frombuffer(texto, dtype=np.uint8).reshape(-1, 14)
+    valores = caracteres.astype(np.int64) - 48
+
+    # 12 posições alfanuméricas (CNPJ alfanumérico, IN RFB 2.229/2024) seguidas de 2 dígitos verificadores
+    eh_digito = (caracteres >= ord("0")) & (caracteres <= ord("9"))
+    eh_letra = (caracteres >= ord("A")) & (caracteres <= ord("Z"))
+    formato = (eh_digito[:, :12] | eh_letra[:, :12]).all(axis=1) & eh_digito[:, 12:].all(axis=1)
+    formato_valido[tamanho_valido] = formato
+
+    resto1 = (valores[:, :12] @ PESOS_DV1) % 11
+    dv1 = np.where(resto1 < 2, 0, 11 - resto1)
+    resto2 = (valores[:, :13] @ PESOS_DV2) % 11
+    dv2 = np.where(resto2 < 2, 0, 11 - resto2)
+
+    # Sequências repetidas (ex: 00000000000000) passam no cálculo, mas não são CNPJs válidos
+    repetidos = (valores == valores[:, :1]).all(axis=1)
+    digitos_validos[tamanho_valido] = (
+        formato & (valores[:, 12] == dv1) & (valores[:, 13] == dv2) & ~repetidos
+    )
+    return formato_valido, digitos_validos
+
+
+def preparar_cnpjs(blocos: Iterable) -> Tuple[List[str], List[dict]]:
+    """
+    Normaliza, valida e remove duplicados de uma lista de CNPJs, preservando a ordem de entrada.
+
+    Args:
+        blocos (Iterable): Lista de CNPJs ou iterável de blocos (listas/pd.Series), como os
+            gerados por ler_arquivo_cnpjs
+
+    Returns:
+        tuple: (cnpjs_validos, registros_invalidos) — os inválidos já como registros REG 999
+    """
+    if isinstance(blocos, pd.Series) or (
+        isinstance(blocos, (list, tuple)) and not (blocos and isinstance(blocos[0], (list, tuple, pd.Series)))
+    ):
+        blocos = [blocos]
+
+    validos = []
+    invalidos = []
+    vistos = set()
+    for bloco in blocos:
+        originais = pd.Series(bloco, dtype=object).dropna().astype(str).str.strip()
+        originais = originais[originais != ""].reset_index(drop=True)
+        if originais.empty:
+            continue
+
+        normalizados = normalizar_cnpjs(originais)
+        formato_valido, digitos_validos = validar_cnpjs(normalizados)
+
+        # Primeira ocorrência no bloco e ainda não vista em blocos anteriores
+        novos = ~normalizados.duplicated().to_numpy()
+        if vistos:
+            novos &= np.fromiter((cnpj not in vistos for cnpj in normalizados.tolist()), dtype=bool, count=len(normalizados))
+        vistos.update(normalizados[novos].tolist())
+
+        validos.extend(normalizados[novos & digitos_validos].tolist())
+        rejeitados = novos & ~digitos_validos
+        for original, formato_ok in zip(originais[rejeitados].tolist(), formato_valido[rejeitados]):
+            motivo = "dígito verificador" if formato_ok else "formato"
+            invalidos.append({"REG": "999", "CNPJ": original, "Falha na consulta": f"CNPJ inválido ({motivo})."})
+    return validos, invalidos
+
+
+def ler_arquivo_cnpjs(caminho: str, coluna: str = None, tamanho_bloco: int = 100_000, separador: str = ",") -> Iterator[pd.Series]:
+    """
+    Lê CNPJs de um arquivo CSV, XLSX ou texto (um por linha) em blocos, sem carregar o arquivo inteiro.
+
+    Args:
+        caminho (str): Arquivo de entrada (.csv, .xlsx ou qualquer outro como texto)
+        coluna (str, optional): Nome da coluna com os CNPJs (CSV/XLSX com cabeçalho).
+            Se omitida, usa a primeira coluna e considera que não há cabeçalho
+        tamanho_bloco (int): Quantidade de linhas por bloco
+        separador (str): Separador de colunas do CSV
+
+    Yields:
+        pd.Series: Bloco de CNPJs como texto, sem normalização
+    """
+    extensao = os.path.splitext(caminho)[1].lower()
+
+    if extensao == ".csv":
+        leitor = pd.read_csv(
+            caminho,
+            sep=separador,
+            dtype=str,
+            header=0 if coluna else None,
+            usecols=[coluna if coluna else 0],
+            chunksize=tamanho_bloco,
+            keep_default_na=False,
+        )
+        for bloco in leitor:
+            yield bloco.iloc[:, 0]
+
+    elif extensao in (".xlsx", ".xlsm"):
+        workbook = load_workbook(caminho, read_only=True)
+        try:
+            linhas = workbook.active.iter_rows(values_only=True)
+            indice = 0
+            if coluna:
+                cabecalho = next(linhas, ())
+                indice = list(cabecalho).index(coluna)
+            bloco = []
+            for linha in linhas:
+                valor = linha[indice] if indice < len(linha) else None
+                # Números do Excel (ex: 1430822000175.0) viram texto sem casas decimais
+                if isinstance(valor, (int, float)):
+                    valor = str(int(valor))
+                bloco.append(valor)
+                if len(bloco) >= tamanho_bloco:
+                    yield pd.Series(bloco, dtype=object)
+                    bloco = []
+            if bloco:
+                yield pd.Series(bloco, dtype=object)
+        finally:
+            workbook.close()
+
+    else:
+        with open(caminho, encoding="utf-8-sig") as arquivo:
+            bloco = []
+            for linha in arquivo:
+                bloco.append(linha)
+                if len(bloco) >= tamanho_bloco:
+                    yield pd.Series(bloco, dtype=object)
+                    bloco = []
+            if bloco:
+                yield pd.Series(bloco, dtype=object)
+
@@ -0,0 +1,400 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+
+# Abaixo deste tamanho a conversão valor a valor (com cache) é mais rápida que a vetorizada
+LIMITE_VETORIZACAO = 64
+
+# Marca respostas em que o REG não foi solicitado (ex: 900 sem verificar_simples)
+_IGNORAR = object()
+_VAZIO = {}
+
+
+def formatar_datas(valores: list) -> list:
+    """
+    Formata datas "AAAA-MM-DD" ou "AAAA-MM-DDTHH:MM:SS.000Z" como "dd/mm/aaaa", em colunas.
+    Vazios e None viram ""; valores que não são datas nesse formato são mantidos como vieram.
+
+    A coluna é fatorada (pandas.factorize) e cada data distinta é convertida uma única vez,
+    o que mantém o custo proporcional ao número de datas diferentes, não ao de linhas.
+    """
+    if len(valores) < LIMITE_VETORIZACAO:
+        return [_formatar_data(valor) for valor in valores]
+
+    codigos, unicos = pd.factorize(np.asarray(valores, dtype=object))
+    # O código -1 (None/NaN) aponta para o último elemento: ""
+    formatados = np.array([_formatar_data(valor) for valor in unicos] + [""], dtype=object)
+    return formatados[codigos].tolist()
+
+
+@lru_cache(maxsize=65_536)
+def _formatar_data(valor) -> str:
+    if valor is None or valor == "" or valor == "None":
+        return ""
+    texto = str(valor)
+    data = texto.split("T", 1)[0]
+    if len(data) != 10 or data.count("-") != 2:
+        return texto
+    try:
+        return datetime.strptime(data, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except ValueError:
+        return texto
+
+
+def _obter(item, chaves: tuple, padrao):
+    for chave in chaves:
+        if not isinstance(item, dict):
+            return padrao
+        item = item.get(chave, padrao)
+    return item
+
+
+class Campo:
+    """
+    Coluna de um registro REG extraída das respostas da API.
+
+    Args:
+        coluna (str): Nome da coluna no registro
+        caminho (str, optional): Chaves separadas por ponto, relativas ao item do registro (ex: "company.name")
+        tipo (str): "texto" (valor como veio), "data" (dd/mm/aaaa) ou "sim_nao" ("Sim"/"Não")
+        padrao: Valor usado quando o caminho não existe na resposta
+        funcao (callable, optional): Calcula o valor a partir do item, no lugar de `caminho`
+    """
+
+    TIPOS = ("texto", "data", "sim_nao")
+
+    __slots__ = ("coluna", "caminho", "tipo", "padrao", "funcao", "_chaves", "_niveis")
+
+    def __init__(self, coluna: str, caminho: str = None, tipo: str = "texto", padrao=None, funcao=None):
+        if (caminho is None) == (funcao is None):
+            raise ValueError(f"Informe `caminho` ou `funcao` para o campo {coluna!r}.")
+        if tipo not in self.TIPOS:
+            raise ValueError(f"Tipo de campo inválido: {tipo}. Use um de {self.TIPOS}.")
+        self.coluna = coluna
+        self.caminho = caminho
+        self.tipo = tipo
+        self.padrao = padrao
+        self.funcao = funcao
+        self._chaves = tuple(caminho.split(".")) if caminho else ()
+        # (prefixo, chave) de cada nível intermediário do caminho, compilados uma única vez
+        self._niveis = tuple((self._chaves[:nivel], self._chaves[nivel - 1]) for nivel in range(1, len(self._chaves)))
+
+    def extrair(self, itens: list, intermediarios: dict = None) -> list:
+        """
+        Valores da coluna para todos os itens de uma vez, nível a nível do caminho.
+        `intermediarios` guarda as colunas de prefixos já extraídos (ex: "company" para
+        "company.name" e "company.equity"), compartilhadas entre os campos do mesmo esquema.
+        """
+        if self.funcao is not None:
+            valores = [self.funcao(item) for item in itens]
+        else:
+            if intermediarios is None:
+                intermediarios = {}
+            try:
+                objetos = itens
+                for prefixo, chave in self._niveis:
+                    coluna = intermediarios.get(prefixo)
+                    if coluna is None:
+                        coluna = intermediarios[prefixo] = [(objeto or _VAZIO).get(chave) for objeto in objetos]
+                    objetos = coluna
+                chave, padrao = self._chaves[-1], self.padrao
+                valores = [(objeto or _VAZIO).get(chave, padrao) for objeto in objetos]
+            except AttributeError:
+                # Algum nível não é um objeto (ex: lista no lugar de dict): percorre item a item
+                valores = [_obter(item, self._chaves, self.padrao) for item in itens]
+
+        if self.tipo == "data":
+            return formatar_datas(valores)
+        if self.tipo == "sim_nao":
+            return ["Sim" if valor else "Não" for valor in valores]
+        return valores
+
+    def __repr__(self) -> str:
+        return f"Campo({self.coluna!r}, {self.caminho or self.funcao!r}, tipo={self.tipo!r})"
+
+
+class EsquemaREG:
+    """
+    Mapeamento declarativo de uma resposta da API para as linhas de um REG.
+
+    Args:
+        reg (str): Código do registro (ex: "001")
+        campos (List[Campo]): Colunas do registro, além de REG e CNPJ (sempre presentes)
+        fonte (str): Resposta usada: "office", "simples" (só com verificar_simples) ou
+            "contribuintes" (só com verificar_contribuintes)
+        lista (str, optional): Caminho dos itens dentro da fonte; gera uma linha por item.
+            Se omitido, gera uma linha por resposta
+        obrigatorio (bool): Gera uma linha com os padrões dos campos quando `lista` não existe na resposta
+        constantes (dict, optional): Colunas com valor fixo (ex: {"Principal": "Sim"})
+        linha_vazia (dict, optional): Linha gerada quando a fonte ou a lista está vazia
+        linha_erro (dict, optional): Linha gerada quando a consulta da fonte falhou (recebe também "Erro")
+    """
+
+    FONTES = ("office", "simples", "contribuintes")
+
+    def __init__(self, reg: str, campos: List[Campo], fonte: str = "office", lista: str = None,
+                 obrigatorio: bool = False, constantes: dict = None, linha_vazia: dict = None,
+                 linha_erro: dict = None):
+        if fonte not in self.FONTES:
+            raise ValueError(f"Fonte inválida: {fonte}. Use uma de {self.FONTES}.")
+        self.reg = reg
+        self.campos = list(campos)
+        self.fonte = fonte
+        self.lista = lista
+        self.obrigatorio = obrigatorio
+        self.constantes = dict(constantes or {})
+        self.linha_vazia = linha_vazia
+        self.linha_erro = linha_erro
+        self._chaves_lista = tuple(lista.split(".")) if lista else ()
+
+    @property
+    def colunas(self) -> List[str]:
+        colunas = ["REG", "CNPJ"] + [campo.coluna for campo in self.campos] + list(self.constantes)
+        for linha in (self.linha_vazia, self.linha_erro):
+            colunas += [coluna for coluna in linha or () if coluna not in colunas]
+        if self.linha_erro is not None and "Erro" not in colunas:
+            colunas.append("Erro")
+        return colunas
+
+    def achatar(self, fontes: list, cnpjs: list) -> tuple:
+        """
+        Extrai as linhas do REG de um bloco de respostas.
+
+        Args:
+            fontes (list): Resposta da fonte do esquema para cada CNPJ (dict, exceção, None ou _IGNORAR)
+            cnpjs (list): CNPJ de cada resposta
+
+        Returns:
+            tuple: (origem, colunas) — índice da resposta de cada linha e as colunas (listas de valores)
+        """
+        itens = []
+        origem = []
+        especiais = []
+        for indice, fonte in enumerate(fontes):
+            if fonte is _IGNORAR:
+                continue
+            if isinstance(fonte, Exception):
+                if self.linha_erro is not None:
+                    especiais.append((indice, {**self.linha_erro, "Erro": str(fonte)}))
+                continue
+
+            if self.lista:
+                valor = _obter(fonte or _VAZIO, self._chaves_lista, None)
+                if isinstance(valor, dict):
+                    itens.append(valor)
+                    origem.append(indice)
+                    continue
+                if valor is None and self.obrigatorio:
+                    itens.append(_VAZIO)
+                    origem.append(indice)
+                    continue
+            else:
+                valor = [fonte] if fonte else None
+
+            if not valor:
+                if self.linha_vazia is not None:
+                    especiais.append((indice, self.linha_vazia))
+                continue
+            itens.extend(valor)
+            origem.extend([indice] * len(valor))
+
+        colunas = {"CNPJ": [cnpjs[indice] for indice in origem]}
+        intermediarios = {}
+        for campo in self.campos:
+            colunas[campo.coluna] = campo.extrair(itens, intermediarios)
+        for coluna, valor in self.constantes.items():
+            colunas[coluna] = [valor] * len(itens)
+
+        if especiais:
+            for coluna in set().union(*(linha for _, linha in especiais)) - set(colunas):
+                colunas[coluna] = [None] * len(origem)
+            for indice, linha in especiais:
+                origem.append(indice)
+                colunas["CNPJ"].append(cnpjs[indice])
+                for coluna, valores in colunas.items():
+                    if coluna != "CNPJ":
+                        valores.append(linha.get(coluna))
+        return origem, colunas
+
+    def fontes(self, respostas: list) -> list:
+        """Resposta usada pelo esquema para cada tupla de respostas (ver EsquemaRegistros.achatar)."""
+        if self.fonte == "office":
+            return [resposta[0] for resposta in respostas]
+        if self.fonte == "simples":
+            return [
+                _IGNORAR if not verificar else simples if simples is not None else simples_do_estabelecimento(dados)
+                for dados, simples, _, verificar, _ in respostas
+            ]
+        return [
+            _IGNORAR if not verificar else contribuintes if contribuintes is not None else dados
+            for dados, _, contribuintes, _, verificar in respostas
+        ]
+
+
+def simples_do_estabelecimento(dados: dict) -> dict:
+    """Adapta o Simples/SIMEI da consulta ao estabelecimento ao formato da resposta de /simples."""
+    empresa = (dados or {}).get("company", {})
+    if "simples" not in empresa and "simei" not in empresa:
+        return None
+    return {
+        "simples": empresa.get("simples") or {},
+        "simei": empresa.get("simei") or {},
+        "updated": dados.get("updated", ""),
+    }
+
+
+ESQUEMA_PADRAO = [
+    EsquemaREG("001", [
+        Campo("Razão Social", "company.name"),
+        Campo("Nome Fantasia", "alias"),
+        Campo("Data Abertura", "founded", tipo="data"),
+        Campo("Capital Social", "company.equity"),
+        Campo("Situação Cadastral", "status.text"),
+        Campo("Natureza Jurídica", "company.nature.text"),
+        Campo("Porte", "company.size.acronym"),
+        Campo("Município", "address.city"),
+        Campo("UF", "address.state"),
+        Campo("CEP", "address.zip"),
+        Campo("Pais", "address.country.name"),
+    ]),
+    EsquemaREG("002", [
+        Campo("CNAE", "id", padrao=""),
+        Campo("Descricao", "text", padrao=""),
+    ], lista="mainActivity", obrigatorio=True, constantes={"Principal": "Sim"}),
+    EsquemaREG("002", [
+        Campo("CNAE", "id"),
+        Campo("Descricao", "text"),
+    ], lista="sideActivities", constantes={"Principal": "Não"}),
+    EsquemaREG("003", [
+        Campo("Nome", "person.name"),
+        Campo("Qualificação", "role.text"),
+        Campo("Idade", "person.age"),
+        Campo("CPF", "person.taxId"),
+    ], lista="company.members"),
+    EsquemaREG("900", [
+        Campo("Simples Nacional", "simples.optant", tipo="sim_nao"),
+        Campo("Data Opção Simples", "simples.since", tipo="data"),
+        Campo("SIMEI", "simei.optant", tipo="sim_nao"),
+        Campo("Data Opção SIMEI", "simei.since", tipo="data"),
+        Campo("Última Atualização", "updated", tipo="data"),
+    ], fonte="simples",
+        linha_vazia={"Simples Nacional": "Dados não disponíveis", "Data Opção Simples": "", "SIMEI": "",
+                     "Data Opção SIMEI": "", "Última Atualização": ""},
+        linha_erro={"Simples Nacional": "Erro na consulta"}),
+    EsquemaREG("800", [
+        Campo("Estado", "state", padrao=""),
+        Campo("Número Inscrição", "number", padrao=""),
+        Campo("Status", "status.text", padrao=""),
+        Campo("Tipo", "type.text", padrao=""),
+        Campo("Ativo", "enabled", tipo="sim_nao"),
+        Campo("Data Status", "statusDate", tipo="data"),
+    ], fonte="contribuintes", lista="registrations",
+        linha_vazia={"Estado": "", "Número Inscrição": "", "Status": "Nenhuma inscrição encontrada", "Tipo": "",
+                     "Ativo": "", "Data Status": ""},
+        linha_erro={"Estado": "", "Número Inscrição": "", "Status": "Erro na consulta", "Tipo": "",
+                    "Ativo": "", "Data Status": ""}),
+]
+
+
+class EsquemaRegistros:
+    """
+    Conjunto de esquemas que converte respostas da API em registros REG, em colunas.
+
+    As respostas de um bloco de CNPJs são achatadas de uma vez por campo (extração em colunas e
+    datas convertidas com pandas), em vez de montar um dict por linha. A ordem das linhas segue a
+    das respostas, como na montagem CNPJ a CNPJ.
+
+    Args:
+        esquemas (List[EsquemaREG], optional): Esquemas dos registros. Padrão: ESQUEMA_PADRAO
+        campos_extras (dict, optional): Campos adicionais por REG, ex:
+            {"001": [Campo("Matriz", "head", tipo="sim_nao")]} — acrescentados a todos os esquemas do REG
+    """
+
+    def __init__(self, esquemas: List[EsquemaREG] = None, campos_extras: Dict[str, List[Campo]] = None):
+        self.esquemas = []
+        for esquema in esquemas or ESQUEMA_PADRAO:
+            extras = (campos_extras or {}).get(esquema.reg)
+            if extras:
+                esquema = EsquemaREG(
+                    esquema.reg, esquema.campos + list(extras), fonte=esquema.fonte, lista=esquema.lista,
+                    obrigatorio=esquema.obrigatorio, constantes=esquema.constantes,
+                    linha_vazia=esquema.linha_vazia, linha_erro=esquema.linha_erro,
+                )
+            self.esquemas.append(esquema)
+
+    @property
+    def colunas(self) -> Dict[str, List[str]]:
+        """Colunas de cada REG, na ordem de exportação (inclui o REG 700 de alterações e o 999 de falhas)."""
+        colunas = {}
+        for esquema in self.esquemas:
+            atuais = colunas.setdefault(esquema.reg, [])
+            atuais += [coluna for coluna in esquema.colunas if coluna not in atuais]
+        colunas["700"] = ["REG", "CNPJ", "Campo", "Anterior", "Atual"]
+        colunas["999"] = ["REG", "CNPJ", "Falha na consulta", "Erro"]
+        return colunas
+
+    def achatar(self, respostas: Iterable[tuple]) -> Dict[str, Dict[str, list]]:
+        """
+        Converte um bloco de respostas nas colunas de cada REG (sem a coluna REG).
+
+        Args:
+            respostas (Iterable[tuple]): Tuplas (dados, dados_simples, dados_contribuintes,
+                verificar_simples, verificar_contribuintes), como as de DiarioLote.respostas.
+                `dados_simples`/`dados_contribuintes` podem ser a resposta, a exceção da consulta ou
+                None (extraídos da própria consulta ao estabelecimento)
+
+        Returns:
+            dict: {reg: {coluna: [valores]}}
+        """
+        # Tuplas curtas, ex: (dados,), completadas com os padrões de _montar_registros
+        padroes = (None, None, None, False, False)
+        respostas = [tuple(resposta) + padroes[len(resposta):] for resposta in respostas]
+        cnpjs = [(resposta[0] or {}).get("taxId") for resposta in respostas]
+
+        partes = {}
+        fontes = {}
+        for esquema in self.esquemas:
+            if esquema.fonte not in fontes:
+                fontes[esquema.fonte] = esquema.fontes(respostas)
+            origem, colunas = esquema.achatar(fontes[esquema.fonte], cnpjs)
+            if origem:
+                partes.setdefault(esquema.reg, []).append((origem, colunas))
+
+        resultado = {}
+        for reg, blocos in partes.items():
+            if len(blocos) == 1:
+                origem, colunas = blocos[0]
+            else:
+                nomes = []
+                for _, colunas_bloco in blocos:
+                    nomes += [nome for nome in colunas_bloco if nome not in nomes]
+                origem = [indice for origem_bloco, _ in blocos for indice in origem_bloco]
+                colunas = {}
+                for nome in nomes:
+                    colunas[nome] = []
+                    for origem_bloco, colunas_bloco in blocos:
+                        colunas[nome] += colunas_bloco.get(nome) or [None] * len(origem_bloco)
+
+            # Linhas de vários esquemas do mesmo REG (ex: CNAE principal e secundários) e linhas de
+            # falha voltam para a ordem das respostas, como na montagem CNPJ a CNPJ
+            if any(anterior > atual for anterior, atual in zip(origem, origem[1:])):
+                ordem = sorted(range(len(origem)), key=origem.__getitem__)
+                colunas = {nome: [valores[i] for i in ordem] for nome, valores in colunas.items()}
+            resultado[reg] = colunas
+        return resultado
+
+    def registros(self, respostas: Iterable[tuple]) -> List[dict]:
+        """Mesmo que achatar, mas como lista de registros (dicts), agrupada por REG."""
+        return list(self.linhas(self.achatar(respostas)))
+
+    @staticmethod
+    def linhas(colunas_por_reg: Dict[str, Dict[str, list]]) -> Iterator[dict]:
+        """Converte o resultado de achatar em registros (dicts), REG a REG."""
+        for reg, colunas in colunas_por_reg.items():
+            nomes = list(colunas)
+            for valores in zip(*colunas.values()):
+                yield {"REG": reg, **dict(zip(nomes, valores))}
@@ -0,0 +1,42 @@
+class CNPJaError(Exception):
+    """
+    Erro base para falhas retornadas pela API CNPJa.
+
+    Args:
+        status_code (int): Código HTTP da resposta (None para falhas de conexão)
+        mensagem (str): Corpo da resposta ou descrição da falha
+        retry_after (float, optional): Segundos sugeridos pelo servidor antes de nova tentativa
+    """
+
+    def __init__(self, status_code: int = None, mensagem: str = "", retry_after: float = None):
+        self.status_code = status_code
+        self.mensagem = mensagem
+        self.retry_after = retry_after
+        if status_code is None:
+            super().__init__(mensagem)
+        else:
+            super().__init__(f"Erro {status_code}: {mensagem}")
+
+
+class CNPJaRateLimitError(CNPJaError):
+    """Limite de requisições excedido (HTTP 429)."""
+
+
+class CNPJaCreditError(CNPJaError):
+    """Créditos insuficientes na conta da chave utilizada (HTTP 402)."""
+
+
+class CNPJaNotFoundError(CNPJaError):
+    """Registro não encontrado (HTTP 404)."""
+
+
+class CNPJaAuthError(CNPJaError):
+    """Chave da API ausente, inválida ou sem permissão (HTTP 401/403)."""
+
+
+class CNPJaServerError(CNPJaError):
+    """Falha no servidor da API (HTTP 5xx)."""
+
+
+class CNPJaConnectionError(CNPJaError):
+    """Falha de rede ou tempo limite esgotado ao contatar a API."""
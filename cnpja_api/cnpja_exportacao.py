@@ -0,0 +1,137 @@
+import csv
+import os
+from typing import Iterable
+
+from openpyxl import Workbook
+
+from cnpja_api.cnpja_esquema import EsquemaRegistros
+
+# Colunas de cada registro, na ordem em que são exportadas (definidas pelo esquema padrão)
+COLUNAS_REG = EsquemaRegistros().colunas
+
+FORMATOS = ("xlsx", "csv", "parquet")
+
+
+class ExportadorStreaming:
+    """
+    Exporta registros REG à medida que chegam, com uso de memória constante.
+
+    - xlsx: um arquivo com uma aba REG_xxx por registro (openpyxl em modo write-only)
+    - csv: um arquivo REG_xxx.csv por registro dentro do diretório de destino
+    - parquet: um arquivo REG_xxx.parquet por registro, gravado em row groups (requer pyarrow)
+
+    As colunas de cada registro seguem `colunas` (padrão: COLUNAS_REG); para registros desconhecidos
+    são usadas as chaves do primeiro registro recebido. Chaves fora dessas colunas são ignoradas.
+
+    Args:
+        destino (str): Arquivo .xlsx ou diretório (csv/parquet)
+        formato (str): "xlsx", "csv" ou "parquet"
+        tamanho_bloco (int): Registros acumulados por row group no formato parquet
+        colunas (dict, optional): Colunas por REG (ex: EsquemaRegistros.colunas com campos extras)
+    """
+
+    def __init__(self, destino: str, formato: str = "xlsx", tamanho_bloco: int = 50_000, colunas: dict = None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportação inválido: {formato}. Use um de {FORMATOS}.")
+
+        self.destino = destino
+        self.formato = formato
+        self.tamanho_bloco = tamanho_bloco
+        self.colunas = colunas or COLUNAS_REG
+        self._colunas = {}
+        self._saidas = {}
+        self._pendentes = {}
+        self._arquivos_csv = {}
+
+        if formato == "xlsx":
+            self._workbook = Workbook(write_only=True)
+        else:
+            os.makedirs(destino, exist_ok=True)
+        if formato == "parquet":
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError as e:
+                raise ImportError("A exportação em parquet requer o pacote pyarrow (pip install pyarrow).") from e
+            self._pa = pyarrow
+            self._pq = pyarrow.parquet
+
+    def escrever(self, registro: dict) -> None:
+        reg = registro["REG"]
+        colunas = self._colunas.get(reg)
+        if colunas is None:
+            colunas = self._abrir_saida(reg, registro)
+        valores = [registro.get(coluna) for coluna in colunas]
+
+        if self.formato == "parquet":
+            pendentes = self._pendentes[reg]
+            pendentes.append(valores)
+            if len(pendentes) >= self.tamanho_bloco:
+                self._gravar_bloco_parquet(reg)
+        else:
+            linha = ["" if valor is None else valor for valor in valores]
+            if self.formato == "csv":
+                self._saidas[reg].writerow(linha)
+            else:
+                self._saidas[reg].append(linha)
+
+    def escrever_varios(self, registros: Iterable[dict]) -> None:
+        for registro in registros:
+            self.escrever(registro)
+
+    def close(self) -> None:
+        if self.formato == "xlsx":
+            if self._workbook is not None:
+                if not self._saidas:
+                    self._workbook.create_sheet("REG_001")
+                self._workbook.save(self.destino)
+                self._workbook = None
+        elif self.formato == "csv":
+            for arquivo in self._arquivos_csv.values():
+                arquivo.close()
+            self._arquivos_csv = {}
+        else:
+            for reg in list(self._saidas):
+                self._gravar_bloco_parquet(reg)
+                self._saidas[reg].close()
+        self._saidas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _abrir_saida(self, reg: str, registro: dict) -> list:
+        colunas = self.colunas.get(reg) or list(registro)
+        self._colunas[reg] = colunas
+        nome = f"REG_{reg}"
+
+        if self.formato == "xlsx":
+            planilha = self._workbook.create_sheet(nome)
+            planilha.append(colunas)
+            self._saidas[reg] = planilha
+        elif self.formato == "csv":
+            arquivo = open(os.path.join(self.destino, f"{nome}.csv"), "w", newline="", encoding="utf-8-sig")
+            self._arquivos_csv[reg] = arquivo
+            escritor = csv.writer(arquivo)
+            escritor.writerow(colunas)
+            self._saidas[reg] = escritor
+        else:
+            # Todas as colunas como texto: os registros misturam números e mensagens de erro
+            schema = self._pa.schema([(coluna, self._pa.string()) for coluna in colunas])
+            self._saidas[reg] = self._pq.ParquetWriter(os.path.join(self.destino, f"{nome}.parquet"), schema)
+            self._pendentes[reg] = []
+        return colunas
+
+    def _gravar_bloco_parquet(self, reg: str) -> None:
+        pendentes = self._pendentes[reg]
+        if not pendentes:
+            return
+        colunas = self._colunas[reg]
+        dados = {
+            coluna: [None if linha[i] is None else str(linha[i]) for linha in pendentes]
+            for i, coluna in enumerate(colunas)
+        }
+        self._saidas[reg].write_table(self._pa.table(dados, schema=self._saidas[reg].schema))
+        self._pendentes[reg] = []
@@ -1,210 +1,432 @@
 import pandas as pd
-import time
-from typing import List
-from datetime import datetime
+import asyncio
+from typing import Dict, Iterable, Iterator, List
 from cnpja_api.cnpja_api import CNPJaAPI
+from cnpja_api.cnpja_api_async import AsyncCNPJaAPI
+from cnpja_api.cnpja_pool import CNPJaPoolAPI
+from cnpja_api.cnpja_rate_limiter import obter_limitador
+from cnpja_api.cnpja_diario import DiarioLote
+from cnpja_api.cnpja_exportacao import ExportadorStreaming
+from cnpja_api.cnpja_resultado import LoteResultado
+from cnpja_api.cnpja_entrada import preparar_cnpjs, ler_arquivo_cnpjs
+from cnpja_api.cnpja_metricas import Metricas, EstimadorVazao
+from cnpja_api.cnpja_esquema import Campo, EsquemaRegistros, formatar_datas
+from cnpja_api.cnpja_snapshots import SnapshotsCNPJ
 
+# Lista de estados brasileiros para consultar inscrições
+ESTADOS_BRASIL = ['AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 
+                  'MT', 'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 
+                  'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO']
 
 
 class CNPJaLoteConsulta:
     
-    def __init__(self, api: CNPJaAPI, consultas_por_minuto: int = 10):
+    # Respostas achatadas de uma vez ao reconstruir diários e converter estabelecimentos
+    TAMANHO_BLOCO = 10_000
+
+    def __init__(self, api: CNPJaAPI = None, consultas_por_minuto: int = 10, metricas: Metricas = None,
+                 campos_extras: Dict[str, List[Campo]] = None):
+        # Sem `api` apenas as operações offline (ex: reexportar_diario) ficam disponíveis
         self.api = api
         self.consultas_por_minuto = consultas_por_minuto
-        self.sleep_time = 60 / self.consultas_por_minuto
+        # Campos extras, ex: {"001": [Campo("Matriz", "head", tipo="sim_nao")]}, entram nos registros e nas exportações
+        self.esquema = EsquemaRegistros(campos_extras=campos_extras)
+        # Todas as chamadas (CNPJ, Simples e inscrições) passam pelo limitador compartilhado da chave.
+        # O pool de chaves já tem um limitador por chave e usa os próprios limites.
+        if self.api is not None and self.api.limitador is None and not isinstance(self.api, CNPJaPoolAPI):
+            self.api.limitador = obter_limitador(self.api.api_key, consultas_por_minuto)
+
+        # Lote e API registram no mesmo objeto, para que o progresso apareça junto das requisições
+        if metricas is None and self.api is not None:
+            metricas = self.api.metricas
+        self.metricas = metricas or Metricas()
+        if self.api is not None and self.api.metricas is None:
+            self.api.metricas = self.metricas
+            for cliente in getattr(self.api, "clientes", []):
+                cliente.metricas = self.metricas
     
     def _formatar_data(self, data_str: str) -> str:
         """
         Formata uma data para o formato brasileiro dd/mm/yyyy
         Aceita formatos: YYYY-MM-DD, YYYY-MM-DDTHH:MM:SS.000Z
         """
-        if not data_str or data_str == "None":
-            return ""
-        
-        try:
-            # Remove informações de timezone se presentes
-            data_limpa = data_str.split('T')[0] if 'T' in data_str else data_str
-            
-            # Tenta parsear a data
-            if len(data_limpa) == 10 and data_limpa.count('-') == 2:
-                # Formato YYYY-MM-DD
-                data_obj = datetime.strptime(data_limpa, '%Y-%m-%d')
-                return data_obj.strftime('%d/%m/%Y')
-            else:
-                # Se não conseguir parsear, retorna a string original
-                return data_str
-        except (ValueError, AttributeError):
-            # Se houver erro na formatação, retorna a string original
-            return data_str
+        return formatar_datas([data_str])[0]
         
     @property
     def saldo_consultas(self):
         return self.api.consultar_saldo()
 
-    def consultar_lote(self, cnpjs: List[str], on_progress=None, check_cancel=None, verificar_simples=False, verificar_contribuintes=False) -> List[dict]:
-        resultados = []
-        cnpjs_unicos = list(set(cnpjs))  # remove duplicados    
+    def consultar_lote(self, cnpjs: List[str], on_progress=None, check_cancel=None, verificar_simples=False, verificar_contribuintes=False, concorrencia: int = 1, diario: str = None, exportador: ExportadorStreaming = None, acumular_resultados: bool = True, snapshots: SnapshotsCNPJ = None, idade_maxima_dias: int = None) -> LoteResultado:
+        """
+        Consulta uma lista de CNPJs e retorna os registros REG 001/002/003/800/900/999.
+
+        Args:
+            cnpjs (List[str]): CNPJs a consultar. São normalizados e validados antes de qualquer consulta:
+                duplicados são ignorados (mantendo a ordem) e inválidos viram REG 999 sem gastar créditos
+            on_progress (callable, optional): Chamado com (atual, total, tempo_restante) a cada CNPJ concluído.
+                O tempo restante vem da vazão recente (média móvel exponencial), também enviada a `self.metricas`
+            check_cancel (callable, optional): Retorna True para interromper o lote
+            verificar_simples (bool): Gera REG 900 com a opção pelo Simples Nacional/SIMEI
+            verificar_contribuintes (bool): Gera REG 800 com as inscrições estaduais
+            concorrencia (int): CNPJs consultados simultaneamente. Acima de 1 usa o executor assíncrono
+            diario (str, optional): Arquivo de diário (.jsonl.gz). As respostas são gravadas à medida que chegam
+                e CNPJs já concluídos em execuções anteriores são retomados do diário, sem nova consulta
+            exportador (ExportadorStreaming, optional): Recebe os registros de cada CNPJ assim que concluído
+            acumular_resultados (bool): Se False, os registros não são mantidos em memória e o
+                resultado retornado fica vazio (use com `exportador` para lotes muito grandes)
+            snapshots (SnapshotsCNPJ, optional): Atualização incremental. CNPJs com retrato mais recente que
+                `idade_maxima_dias` vêm do retrato, sem consulta; os demais são consultados, comparados com o
+                retrato anterior (alterações em REG 700) e o retrato é atualizado
+            idade_maxima_dias (int, optional): Idade máxima dos retratos reaproveitados, também enviada à API
+                (maxAge) para aceitar dados já armazenados pela CNPJa. Se omitida, todos os CNPJs são consultados
+
+        Returns:
+            LoteResultado: Registros da consulta, separados por REG
+        """
+        if concorrencia > 1:
+            return asyncio.run(self.consultar_lote_async(
+                cnpjs,
+                on_progress=on_progress,
+                check_cancel=check_cancel,
+                verificar_simples=verificar_simples,
+                verificar_contribuintes=verificar_contribuintes,
+                concorrencia=concorrencia,
+                diario=diario,
+                exportador=exportador,
+                acumular_resultados=acumular_resultados,
+                snapshots=snapshots,
+                idade_maxima_dias=idade_maxima_dias,
+            ))
+
+        resultados = LoteResultado()
+        cnpjs_unicos, invalidos = preparar_cnpjs(cnpjs)
         total = len(cnpjs_unicos)
+        if exportador:
+            exportador.escrever_varios(invalidos)
+        if acumular_resultados:
+            resultados.extend(invalidos)
 
-        tempo_primeira_consulta = None
-
-        for i, cnpj in enumerate(cnpjs_unicos):
-            try:
-                # Consulta CNPJ
-                inicio = time.time()
-                dados = self.api.consultar_cnpj(cnpj)
-                time.sleep(self.sleep_time)  # Respeita o limite configurado
-                fim = time.time()
-                
-                if tempo_primeira_consulta is None:
-                    tempo_primeira_consulta = fim - inicio
-                
-                dados_cnpj = {
-                    "REG": "001",
-                    "CNPJ": dados.get("taxId"),
-                    "Razão Social": dados.get("company", {}).get("name"),
-                    "Nome Fantasia": dados.get("alias"),
-                    "Data Abertura": self._formatar_data(dados.get("founded")),
-                    "Capital Social": dados.get("company", {}).get("equity"),
-                    "Situação Cadastral": dados.get("status", {}).get("text"),
-                    "Natureza Jurídica": dados.get("company", {}).get("nature", {}).get("text"),
-                    "Porte": dados.get("company", {}).get("size", {}).get("acronym"),
-                    "Município": dados.get("address", {}).get("city"),
-                    "UF": dados.get("address", {}).get("state"),
-                    "CEP": dados.get("address", {}).get("zip"),
-                    "Pais": dados.get("address", {}).get("country", {}).get("name")
-                }
-                resultados.append(dados_cnpj)
-                
-                resultados.append({
-                    "REG": "002",
-                    "CNPJ": dados.get("taxId"),
-                    "CNAE": dados.get("mainActivity", {}).get("id", ""),
-                    "Descricao": dados.get("mainActivity", {}).get("text", ""),
-                    "Principal": "Sim"
-                })
-
-                for atividade in dados.get("sideActivities", []):
-                    resultados.append({
-                        "REG": "002",
-                        "CNPJ": dados.get("taxId"),
-                        "CNAE": atividade.get("id"),
-                        "Descricao": atividade.get("text"),
-                        "Principal": "Não"
-                    })
-                
-                for socio in dados.get("company", {}).get("members", []):
-                    resultados.append({
-                        "REG": "003",
-                        "CNPJ": dados.get("taxId"),
-                        "Nome": socio.get("person", {}).get("name"),
-                        "Qualificação": socio.get("role", {}).get("text"),
-                        "Idade": socio.get("person", {}).get("age"),
-                        "CPF": socio.get("person", {}).get("taxId"),
-                    })
-                
-                # Consulta Simples Nacional se solicitado
-                if verificar_simples:
+        diario_lote = DiarioLote(diario) if diario else None
+        reaproveitados = self._reaproveitar_diario(
+            diario_lote, cnpjs_unicos, verificar_simples, verificar_contribuintes,
+            exportador, resultados if acumular_resultados else None, on_progress, total
+        )
+        recentes = snapshots.recentes(cnpjs_unicos, idade_maxima_dias) if snapshots is not None and idade_maxima_dias is not None else {}
+        plano = self._planejar_consulta(verificar_simples, verificar_contribuintes, idade_maxima_dias if snapshots is not None else None)
+        estimador = EstimadorVazao(total - len(reaproveitados))
+        concluidos = len(reaproveitados)
+
+        try:
+            for cnpj in cnpjs_unicos:
+                if cnpj in reaproveitados:
+                    continue
+                entrada = self._snapshot_recente(snapshots, recentes, cnpj, verificar_simples, verificar_contribuintes)
+                if entrada is not None:
+                    # Retrato recente (atualização incremental): reaproveita a resposta gravada
+                    registros = self._registros_do_diario(entrada)
+                else:
                     try:
-                        dados_simples = self.api.consultar_simples(cnpj)
-                        if dados_simples:
-                            simples_data = dados_simples.get("simples", {})
-                            simei_data = dados_simples.get("simei", {})
-                            
-                            is_simples = simples_data.get("optant", False)
-                            is_simei = simei_data.get("optant", False)
-                            
-                            resultados.append({
-                                "REG": "900",
-                                "CNPJ": dados.get("taxId"),
-                                "Simples Nacional": "Sim" if is_simples else "Não",
-                                "Data Opção Simples": self._formatar_data(simples_data.get("since", "")),
-                                "SIMEI": "Sim" if is_simei else "Não",
-                                "Data Opção SIMEI": self._formatar_data(simei_data.get("since", "")),
-                                "Última Atualização": self._formatar_data(dados_simples.get("updated", ""))
-                            })
-                        else:
-                            resultados.append({
-                                "REG": "900",
-                                "CNPJ": dados.get("taxId"),
-                                "Simples Nacional": "Dados não disponíveis",
-                                "Data Opção Simples": "",
-                                "SIMEI": "",
-                                "Data Opção SIMEI": "",
-                                "Última Atualização": ""
-                            })
+                        resposta = self.api.consultar_cnpj(cnpj, **plano)
                     except Exception as e:
-                        resultados.append({
-                            "REG": "900",
-                            "CNPJ": dados.get("taxId"),
-                            "Simples Nacional": "Erro na consulta",
-                            "Erro": str(e)
-                        })
-                
-                # Consulta Cadastro de Contribuintes se solicitado
-                if verificar_contribuintes:
+                        resposta = e
+                    registros = self._processar_resposta(
+                        cnpj, resposta, diario_lote, snapshots, verificar_simples, verificar_contribuintes
+                    )
+
+                if exportador:
+                    exportador.escrever_varios(registros)
+                if acumular_resultados:
+                    resultados.extend(registros)
+
+                concluidos += 1
+                tempo_restante = self._registrar_progresso(estimador, concluidos, total, len(reaproveitados))
+                if on_progress:
+                    on_progress(concluidos, total, tempo_restante)
+
+                # Se cancelou, adiciona uma linha de log no fim (sem sobrepor resultados)
+                if check_cancel and check_cancel():
+                    cancelamento = {"REG": "999", "CNPJ": "", "Erro": "Consulta cancelada pelo usuário."}
+                    if exportador:
+                        exportador.escrever(cancelamento)
+                    resultados.append(cancelamento)
+                    break
+        finally:
+            if diario_lote:
+                diario_lote.close()
+        return resultados
+
+    def _processar_resposta(self, cnpj: str, resposta, diario_lote: DiarioLote, snapshots: SnapshotsCNPJ, verificar_simples: bool, verificar_contribuintes: bool) -> List[dict]:
+        """
+        Trata a resposta da consulta de um CNPJ (ou a exceção da consulta), igual nos lotes sequencial
+        e assíncrono: grava no diário, monta os registros e, na atualização incremental, o REG 700.
+        """
+        chave = self.api._normalize_taxid(cnpj)
+        if isinstance(resposta, Exception):
+            if diario_lote:
+                diario_lote.registrar(chave, erro=resposta)
+            return [{"REG": "999", "CNPJ": cnpj, "Falha na consulta": str(resposta)}]
+
+        entrada = DiarioLote.entrada(
+            chave, resposta, verificar_simples=verificar_simples, verificar_contribuintes=verificar_contribuintes
+        )
+        if diario_lote:
+            diario_lote.gravar(entrada)
+        registros = self._montar_registros(resposta, verificar_simples=verificar_simples, verificar_contribuintes=verificar_contribuintes)
+        if snapshots is not None:
+            # Alterações em relação ao retrato anterior (REG 700)
+            registros += snapshots.atualizar(chave, entrada)
+        return registros
+
+    async def consultar_lote_async(self, cnpjs: List[str], on_progress=None, check_cancel=None, verificar_simples=False, verificar_contribuintes=False, concorrencia: int = 10, diario: str = None, exportador: ExportadorStreaming = None, acumular_resultados: bool = True, snapshots: SnapshotsCNPJ = None, idade_maxima_dias: int = None) -> LoteResultado:
+        """
+        Versão assíncrona de consultar_lote: consulta até `concorrencia` CNPJs ao mesmo tempo.
+        A cota por minuto é respeitada pelo limitador da API, compartilhado entre as consultas.
+        Os registros são retornados na ordem dos CNPJs, como na versão sequencial.
+        """
+        cnpjs_unicos, invalidos = preparar_cnpjs(cnpjs)
+        total = len(cnpjs_unicos)
+        if exportador:
+            exportador.escrever_varios(invalidos)
+        resultados = LoteResultado(invalidos if acumular_resultados else None)
+        diario_lote = DiarioLote(diario) if diario else None
+        reaproveitados = self._reaproveitar_diario(
+            diario_lote, cnpjs_unicos, verificar_simples, verificar_contribuintes,
+            exportador, resultados if acumular_resultados else None, on_progress, total
+        )
+        recentes = snapshots.recentes(cnpjs_unicos, idade_maxima_dias) if snapshots is not None and idade_maxima_dias is not None else {}
+        plano = self._planejar_consulta(verificar_simples, verificar_contribuintes, idade_maxima_dias if snapshots is not None else None)
+        registros_por_indice = {}
+        pendentes = ((indice, cnpj) for indice, cnpj in enumerate(cnpjs_unicos) if cnpj not in reaproveitados)
+        concluidos = len(reaproveitados)
+        cancelado = False
+        estimador = EstimadorVazao(total - len(reaproveitados))
+
+        async def trabalhador(api_async: AsyncCNPJaAPI):
+            nonlocal concluidos, cancelado
+            for indice, cnpj in pendentes:
+                if cancelado:
+                    return
+                entrada = self._snapshot_recente(snapshots, recentes, cnpj, verificar_simples, verificar_contribuintes)
+                if entrada is not None:
+                    registros = self._registros_do_diario(entrada)
+                else:
                     try:
-                        # Lista de estados brasileiros para consultar inscrições
-                        estados_brasil = ['AC', 'AL', 'AP', 'AM', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 
-                                         'MT', 'MS', 'MG', 'PA', 'PB', 'PR', 'PE', 'PI', 'RJ', 'RN', 
-                                         'RS', 'RO', 'RR', 'SC', 'SP', 'SE', 'TO']
-                        dados_contribuintes = self.api.consultar_cadastro_contribuintes(cnpj, registrations=estados_brasil)
-                        if dados_contribuintes and dados_contribuintes.get("registrations"):
-                            for registro in dados_contribuintes.get("registrations", []):
-                                resultados.append({
-                                    "REG": "800",
-                                    "CNPJ": dados.get("taxId"),
-                                    "Estado": registro.get("state", ""),
-                                    "Número Inscrição": registro.get("number", ""),
-                                    "Status": registro.get("status", {}).get("text", ""),
-                                    "Tipo": registro.get("type", {}).get("text", ""),
-                                    "Ativo": "Sim" if registro.get("enabled", False) else "Não",
-                                    "Data Status": self._formatar_data(registro.get("statusDate", ""))
-                                })
-                        else:
-                            resultados.append({
-                                "REG": "800",
-                                "CNPJ": dados.get("taxId"),
-                                "Estado": "",
-                                "Número Inscrição": "",
-                                "Status": "Nenhuma inscrição encontrada",
-                                "Tipo": "",
-                                "Ativo": "",
-                                "Data Status": ""
-                            })
+                        resposta = await api_async.consultar_cnpj(cnpj, **plano)
                     except Exception as e:
-                        resultados.append({
-                            "REG": "800",
-                            "CNPJ": dados.get("taxId"),
-                            "Estado": "",
-                            "Número Inscrição": "",
-                            "Status": "Erro na consulta",
-                            "Tipo": "",
-                            "Ativo": "",
-                            "Data Status": "",
-                            "Erro": str(e)
-                        })
-                
-            except Exception as e:
-                resultados.append({"REG": "999", "CNPJ": cnpj, "Falha na consulta": str(e)})
-            
-            if on_progress:
-                if tempo_primeira_consulta:
-                    tempo_restante = (total - (i + 1)) * tempo_primeira_consulta
-                else:
-                    tempo_restante = None
-                on_progress(i + 1, total, tempo_restante)
-            
-            # Se cancelou, adiciona uma linha de log no fim (sem sobrepor resultados)
-            if check_cancel and check_cancel():
-                resultados.append({"REG": "999", "CNPJ": "", "Erro": "Consulta cancelada pelo usuário."})  
-                break      
-            
+                        resposta = e
+                    registros = self._processar_resposta(
+                        cnpj, resposta, diario_lote, snapshots, verificar_simples, verificar_contribuintes
+                    )
+
+                # Exportados na ordem de conclusão; a lista retornada segue a ordem dos CNPJs
+                if exportador:
+                    exportador.escrever_varios(registros)
+                if acumular_resultados:
+                    registros_por_indice[indice] = registros
+
+                concluidos += 1
+                tempo_restante = self._registrar_progresso(estimador, concluidos, total, len(reaproveitados))
+                if on_progress:
+                    on_progress(concluidos, total, tempo_restante)
+
+                if check_cancel and check_cancel():
+                    cancelado = True
+                    return
+
+        try:
+            async with AsyncCNPJaAPI(self.api, concorrencia=concorrencia) as api_async:
+                await asyncio.gather(*(trabalhador(api_async) for _ in range(concorrencia)))
+        finally:
+            if diario_lote:
+                diario_lote.close()
+
+        for indice in sorted(registros_por_indice):
+            resultados.extend(registros_por_indice[indice])
+        if cancelado:
+            cancelamento = {"REG": "999", "CNPJ": "", "Erro": "Consulta cancelada pelo usuário."}
+            if exportador:
+                exportador.escrever(cancelamento)
+            resultados.append(cancelamento)
+        return resultados
+
+    def _registrar_progresso(self, estimador: EstimadorVazao, concluidos: int, total: int, reaproveitados: int = 0) -> float:
+        """
+        Atualiza a vazão do lote, publica o progresso nas métricas e retorna o tempo restante estimado.
+        CNPJs reaproveitados do diário contam no progresso, mas não na vazão das consultas.
+        """
+        estimador.registrar(concluidos - reaproveitados)
+        tempo_restante = estimador.tempo_restante(concluidos - reaproveitados)
+        self.metricas.registrar_progresso(concluidos, total, estimador.vazao, tempo_restante)
+        return tempo_restante
+
+    def _planejar_consulta(self, verificar_simples: bool, verificar_contribuintes: bool, max_age: int = None) -> dict:
+        """
+        Monta os parâmetros de uma única consulta ao estabelecimento que já traz Simples Nacional
+        e inscrições estaduais, em vez de consultar /simples e repetir /office para as inscrições.
+        """
+        plano = {}
+        if max_age is not None:
+            plano["max_age"] = max_age
+        if verificar_simples:
+            plano["simples"] = True
+        if verificar_contribuintes:
+            plano["registrations"] = ESTADOS_BRASIL
+        return plano
+
+    def registros_de_escritorios(self, escritorios: Iterable[dict]) -> Iterator[dict]:
+        """
+        Converte estabelecimentos já obtidos (ex: CNPJaAPI.buscar_empresas_por_nome) em registros
+        REG 001/002/003, achatados em blocos de TAMANHO_BLOCO, prontos para um ExportadorStreaming.
+        """
+        bloco = []
+        for dados in escritorios:
+            bloco.append((dados,))
+            if len(bloco) >= self.TAMANHO_BLOCO:
+                yield from self.esquema.registros(bloco)
+                bloco = []
+        if bloco:
+            yield from self.esquema.registros(bloco)
+
+    def consultar_arquivo(self, caminho: str, coluna: str = None, separador: str = ",", **kwargs) -> LoteResultado:
+        """
+        Lê os CNPJs de um arquivo CSV, XLSX ou texto (em blocos) e consulta o lote.
+
+        Args:
+            caminho (str): Arquivo de entrada
+            coluna (str, optional): Coluna com os CNPJs. Se omitida, usa a primeira coluna, sem cabeçalho
+            separador (str): Separador de colunas do CSV
+            **kwargs: Parâmetros repassados a consultar_lote
+
+        Returns:
+            LoteResultado: Registros da consulta, separados por REG
+        """
+        return self.consultar_lote(ler_arquivo_cnpjs(caminho, coluna=coluna, separador=separador), **kwargs)
+
+    def reexportar_diario(self, diario: str) -> LoteResultado:
+        """
+        Reconstrói os registros REG a partir de um diário gravado por consultar_lote, sem acessar a API.
+        Pode ser usado com CNPJaLoteConsulta(api=None).
+
+        Args:
+            diario (str): Arquivo de diário (.jsonl.gz)
+
+        Returns:
+            LoteResultado: Registros dos CNPJs gravados no diário
+        """
+        # Lido em streaming: só os CNPJs já exportados e as falhas (sem sucesso até o momento) ficam em memória
+        resultados = LoteResultado()
+        concluidos = set()
+        falhas = {}
+        bloco = []
+        for entrada in DiarioLote(diario).ler():
+            cnpj = entrada["cnpj"]
+            if cnpj in concluidos:
+                continue
+            if "erro" in entrada:
+                falhas[cnpj] = entrada
+                continue
+            concluidos.add(cnpj)
+            falhas.pop(cnpj, None)
+            bloco.append(DiarioLote.respostas(entrada))
+            if len(bloco) >= self.TAMANHO_BLOCO:
+                self._emitir_respostas(bloco, None, resultados)
+                bloco = []
+        self._emitir_respostas(bloco, None, resultados)
+        for entrada in falhas.values():
+            resultados.extend(self._registros_do_diario(entrada))
         return resultados
 
-    def exportar_para_excel(self, resultados: List[dict], caminho_arquivo: str) -> None:
-        df = pd.DataFrame(resultados)
+    def _emitir_respostas(self, respostas: List[tuple], exportador: ExportadorStreaming, resultados: LoteResultado) -> None:
+        """Achata um bloco de respostas e envia os registros ao exportador e/ou a `resultados`."""
+        if not respostas:
+            return
+        colunas_por_reg = self.esquema.achatar(respostas)
+        if exportador:
+            exportador.escrever_varios(self.esquema.linhas(colunas_por_reg))
+        if resultados is not None:
+            for reg, colunas in colunas_por_reg.items():
+                resultados.adicionar_colunas(reg, colunas)
+
+    def _reaproveitar_diario(self, diario_lote: DiarioLote, cnpjs: List[str], verificar_simples: bool, verificar_contribuintes: bool,
+                             exportador: ExportadorStreaming, resultados: LoteResultado, on_progress, total: int) -> set:
+        """
+        Lê o diário uma única vez, em streaming: os registros dos CNPJs do lote já concluídos (com todas
+        as consultas pedidas) em execuções anteriores vão direto ao exportador e a `resultados`, em blocos.
+        Retorna apenas o conjunto desses CNPJs, que não são consultados de novo.
+        """
+        if diario_lote is None:
+            return set()
+        do_lote = set(cnpjs)
+        reaproveitados = set()
+        bloco = []
+        for entrada in diario_lote.ler():
+            cnpj = entrada["cnpj"]
+            if cnpj not in do_lote or cnpj in reaproveitados or not self._entrada_completa(entrada, verificar_simples, verificar_contribuintes):
+                continue
+            reaproveitados.add(cnpj)
+            bloco.append(DiarioLote.respostas(entrada))
+            if len(bloco) >= self.TAMANHO_BLOCO:
+                self._emitir_respostas(bloco, exportador, resultados)
+                bloco = []
+        self._emitir_respostas(bloco, exportador, resultados)
+
+        if reaproveitados:
+            self.metricas.registrar_progresso(len(reaproveitados), total)
+            if on_progress:
+                on_progress(len(reaproveitados), total, None)
+        return reaproveitados
+
+    def _snapshot_recente(self, snapshots: SnapshotsCNPJ, recentes: dict, cnpj: str,
+                          verificar_simples: bool, verificar_contribuintes: bool) -> dict:
+        """
+        Retrato recente do CNPJ (atualização incremental), carregado só quando usado, ou None se
+        não houver ou se ele não trouxer todas as consultas pedidas.
+        """
+        if cnpj not in recentes:
+            return None
+        entrada = snapshots.obter(cnpj)
+        if entrada is None or not self._entrada_completa(entrada, verificar_simples, verificar_contribuintes):
+            return None
+        return entrada
+
+    @staticmethod
+    def _entrada_completa(entrada: dict, verificar_simples: bool, verificar_contribuintes: bool) -> bool:
+        """Entrada bem-sucedida que já traz todas as consultas pedidas (Simples e inscrições)."""
+        return (
+            "erro" not in entrada
+            and ("simples" in entrada or not verificar_simples)
+            and ("contribuintes" in entrada or not verificar_contribuintes)
+        )
+
+    def _registros_do_diario(self, entrada: dict) -> List[dict]:
+        if "erro" in entrada:
+            return [{"REG": "999", "CNPJ": entrada["cnpj"], "Falha na consulta": entrada["erro"]}]
+        return self._montar_registros(*DiarioLote.respostas(entrada))
+
+    def _montar_registros(self, dados: dict, dados_simples=None, dados_contribuintes=None, verificar_simples=False, verificar_contribuintes=False) -> List[dict]:
+        """
+        Converte as respostas da API de um CNPJ nos registros REG 001/002/003/900/800 (ver `self.esquema`).
+        `dados_simples` e `dados_contribuintes` podem ser a resposta (dict) ou a exceção da consulta;
+        se omitidos, são extraídos da própria consulta ao estabelecimento (ver _planejar_consulta).
+        """
+        return self.esquema.registros([(dados, dados_simples, dados_contribuintes, verificar_simples, verificar_contribuintes)])
+
+    def exportar(self, resultados: LoteResultado, destino: str, formato: str = "xlsx") -> None:
+        """
+        Exporta os registros em streaming (memória constante) para xlsx, csv ou parquet.
+        Ao contrário de exportar_para_excel, mantém todas as colunas de cada registro.
+
+        Args:
+            resultados (LoteResultado): Registros retornados por consultar_lote (ou lista de dicts)
+            destino (str): Arquivo .xlsx ou diretório (csv/parquet)
+            formato (str): "xlsx", "csv" ou "parquet"
+        """
+        with ExportadorStreaming(destino, formato, colunas=self.esquema.colunas) as exportador:
+            exportador.escrever_varios(resultados)
+
+    def exportar_para_excel(self, resultados: LoteResultado, caminho_arquivo: str) -> None:
+        if not isinstance(resultados, LoteResultado):
+            resultados = LoteResultado(resultados)
         with pd.ExcelWriter(caminho_arquivo, engine="openpyxl") as writer:
-            for registro in df["REG"].unique():
-                df_relatorio = df[df["REG"] == registro].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna("")
+            for registro, df_relatorio in resultados.dataframes().items():
                 df_relatorio.to_excel(writer, sheet_name=f"REG_{registro}", index=False)
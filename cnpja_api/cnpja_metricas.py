@@ -0,0 +1,253 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit, parse_qsl
+
+
+def endpoint_da_url(url: str) -> str:
+    """Primeiro segmento do caminho da URL (ex: "office", "simples", "credit")."""
+    segmentos = [s for s in urlsplit(url).path.split("/") if s]
+    return segmentos[0] if segmentos else ""
+
+
+class Metricas:
+    """
+    Instrumentação do cliente e dos lotes: latência por endpoint (histograma), requisições,
+    erros, novas tentativas, acertos de cache, requisições agrupadas, créditos estimados, espera
+    no limitador de taxa e progresso do lote.
+
+    Os valores podem ser lidos em `resumo()`, exportados no formato texto do Prometheus com
+    `exportar_prometheus()` ou acompanhados em tempo real com `assinar(callback)`: cada callback
+    recebe um dict com a chave "tipo" ("requisicao", "nova_tentativa", "cache", "agrupada" ou "progresso").
+
+    Args:
+        limites_latencia (tuple, optional): Limites superiores (segundos) dos buckets do histograma
+    """
+
+    LIMITES_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    # Tabela de custo usada para estimar os créditos gastos em cada resposta da rede
+    # (consultas atendidas pelo cache local não gastam créditos)
+    CUSTO_CREDITOS = {"office": 1, "simples": 1, "rfb": 1, "person": 1}
+    CUSTO_PARAMETROS = {"simples": 1, "registrations": 1}
+
+    def __init__(self, limites_latencia: tuple = None):
+        self.limites_latencia = tuple(limites_latencia or self.LIMITES_LATENCIA)
+        self._lock = threading.Lock()
+        self._assinantes = []
+
+        self._requisicoes = defaultdict(int)        # (endpoint, status) -> total
+        self._erros = defaultdict(int)              # (endpoint, tipo) -> total
+        self._novas_tentativas = defaultdict(int)   # endpoint -> total
+        self._cache = defaultdict(int)              # (endpoint, "acerto"|"falta") -> total
+        self._agrupadas = defaultdict(int)          # endpoint -> total
+        self._creditos = defaultdict(int)           # endpoint -> total
+        self._buckets = {}                          # endpoint -> contagem por bucket (+Inf no fim)
+        self._soma_latencia = defaultdict(float)
+        self._espera_limitador = 0.0
+        self._progresso = {}
+
+    def assinar(self, callback) -> None:
+        """Registra uma função chamada a cada evento. Exceções do callback são ignoradas."""
+        with self._lock:
+            self._assinantes.append(callback)
+
+    def creditos_estimados(self, url: str) -> int:
+        """Créditos estimados de uma consulta bem-sucedida, pela tabela CUSTO_CREDITOS/CUSTO_PARAMETROS."""
+        custo = self.CUSTO_CREDITOS.get(endpoint_da_url(url), 0)
+        if custo:
+            for nome, valor in parse_qsl(urlsplit(url).query):
+                if valor and valor != "false":
+                    custo += self.CUSTO_PARAMETROS.get(nome, 0)
+        return custo
+
+    def registrar_requisicao(self, url: str, latencia: float, status: int = None, erro: Exception = None) -> None:
+        """Registra uma tentativa de requisição HTTP. `status` é None em falhas de conexão."""
+        endpoint = endpoint_da_url(url)
+        creditos = self.creditos_estimados(url) if status == 200 else 0
+        with self._lock:
+            self._requisicoes[(endpoint, str(status) if status else "erro_conexao")] += 1
+            buckets = self._buckets.get(endpoint)
+            if buckets is None:
+                buckets = self._buckets[endpoint] = [0] * (len(self.limites_latencia) + 1)
+            buckets[bisect.bisect_left(self.limites_latencia, latencia)] += 1
+            self._soma_latencia[endpoint] += latencia
+            if erro is not None:
+                self._erros[(endpoint, type(erro).__name__)] += 1
+            self._creditos[endpoint] += creditos
+        self._emitir({"tipo": "requisicao", "endpoint": endpoint, "latencia": latencia, "status": status,
+                      "erro": str(erro) if erro else None})
+
+    def registrar_nova_tentativa(self, url: str) -> None:
+        endpoint = endpoint_da_url(url)
+        with self._lock:
+            self._novas_tentativas[endpoint] += 1
+        self._emitir({"tipo": "nova_tentativa", "endpoint": endpoint})
+
+    def registrar_cache(self, url: str, acerto: bool) -> None:
+        endpoint = endpoint_da_url(url)
+        with self._lock:
+            self._cache[(endpoint, "acerto" if acerto else "falta")] += 1
+        self._emitir({"tipo": "cache", "endpoint": endpoint, "acerto": acerto})
+
+    def registrar_agrupada(self, url: str) -> None:
+        """Registra uma chamada atendida por uma requisição idêntica já em andamento (sem gastar créditos)."""
+        endpoint = endpoint_da_url(url)
+        with self._lock:
+            self._agrupadas[endpoint] += 1
+        self._emitir({"tipo": "agrupada", "endpoint": endpoint})
+
+    def registrar_espera_limitador(self, segundos: float) -> None:
+        with self._lock:
+            self._espera_limitador += segundos
+
+    def registrar_progresso(self, concluidos: int, total: int, vazao: float = None, tempo_restante: float = None) -> None:
+        progresso = {"concluidos": concluidos, "total": total, "vazao": vazao, "tempo_restante": tempo_restante}
+        with self._lock:
+            self._progresso = progresso
+        self._emitir({"tipo": "progresso", **progresso})
+
+    def percentil(self, endpoint: str, q: float) -> float:
+        """Estimativa do percentil `q` (0-1) da latência: limite superior do bucket que o contém."""
+        with self._lock:
+            buckets = list(self._buckets.get(endpoint, ()))
+        total = sum(buckets)
+        if not total:
+            return None
+        acumulado = 0
+        for indice, contagem in enumerate(buckets):
+            acumulado += contagem
+            if acumulado >= q * total:
+                return self.limites_latencia[indice] if indice < len(self.limites_latencia) else float("inf")
+        return float("inf")
+
+    def resumo(self) -> dict:
+        """Totais por endpoint, taxa de acerto do cache, créditos estimados e progresso do lote."""
+        with self._lock:
+            endpoints = (
+                {endpoint for endpoint, _ in self._requisicoes} | {endpoint for endpoint, _ in self._cache}
+                | set(self._agrupadas)
+            )
+            resumo = {"endpoints": {}, "espera_limitador": self._espera_limitador, "progresso": dict(self._progresso)}
+            for endpoint in sorted(endpoints):
+                requisicoes = sum(total for (e, _), total in self._requisicoes.items() if e == endpoint)
+                acertos = self._cache[(endpoint, "acerto")]
+                faltas = self._cache[(endpoint, "falta")]
+                resumo["endpoints"][endpoint] = {
+                    "requisicoes": requisicoes,
+                    "erros": sum(total for (e, _), total in self._erros.items() if e == endpoint),
+                    "novas_tentativas": self._novas_tentativas[endpoint],
+                    "latencia_media": self._soma_latencia[endpoint] / requisicoes if requisicoes else None,
+                    "taxa_acerto_cache": acertos / (acertos + faltas) if acertos + faltas else None,
+                    "requisicoes_agrupadas": self._agrupadas[endpoint],
+                    "creditos_estimados": self._creditos[endpoint],
+                }
+        for endpoint, dados in resumo["endpoints"].items():
+            dados["latencia_p50"] = self.percentil(endpoint, 0.5)
+            dados["latencia_p99"] = self.percentil(endpoint, 0.99)
+        return resumo
+
+    def exportar_prometheus(self) -> str:
+        """Métricas no formato de exposição em texto do Prometheus."""
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, amostras):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in amostras:
+                texto_rotulos = ",".join(f'{chave}="{valor_rotulo}"' for chave, valor_rotulo in rotulos)
+                linhas.append(f"{nome}{{{texto_rotulos}}} {valor}" if texto_rotulos else f"{nome} {valor}")
+
+        with self._lock:
+            metrica("cnpja_requisicoes_total", "counter", "Requisições HTTP feitas à API CNPJa",
+                    [((("endpoint", e), ("status", s)), v) for (e, s), v in sorted(self._requisicoes.items())])
+            metrica("cnpja_erros_total", "counter", "Requisições que terminaram em erro, por tipo",
+                    [((("endpoint", e), ("tipo", t)), v) for (e, t), v in sorted(self._erros.items())])
+            metrica("cnpja_novas_tentativas_total", "counter", "Novas tentativas após 429, 5xx ou falha de rede",
+                    [((("endpoint", e),), v) for e, v in sorted(self._novas_tentativas.items())])
+            metrica("cnpja_cache_total", "counter", "Consultas ao cache local, por resultado",
+                    [((("endpoint", e), ("resultado", r)), v) for (e, r), v in sorted(self._cache.items())])
+            metrica("cnpja_requisicoes_agrupadas_total", "counter",
+                    "Chamadas atendidas por uma requisição idêntica já em andamento",
+                    [((("endpoint", e),), v) for e, v in sorted(self._agrupadas.items())])
+            metrica("cnpja_creditos_estimados_total", "counter", "Créditos estimados gastos em respostas da rede",
+                    [((("endpoint", e),), v) for e, v in sorted(self._creditos.items())])
+            metrica("cnpja_espera_limitador_segundos_total", "counter", "Tempo total aguardando o limitador de taxa",
+                    [((), round(self._espera_limitador, 6))])
+
+            linhas.append("# HELP cnpja_latencia_segundos Latência das requisições HTTP por endpoint")
+            linhas.append("# TYPE cnpja_latencia_segundos histogram")
+            for endpoint, buckets in sorted(self._buckets.items()):
+                acumulado = 0
+                for limite, contagem in zip(self.limites_latencia + ("+Inf",), buckets):
+                    acumulado += contagem
+                    linhas.append(f'cnpja_latencia_segundos_bucket{{endpoint="{endpoint}",le="{limite}"}} {acumulado}')
+                linhas.append(f'cnpja_latencia_segundos_sum{{endpoint="{endpoint}"}} {round(self._soma_latencia[endpoint], 6)}')
+                linhas.append(f'cnpja_latencia_segundos_count{{endpoint="{endpoint}"}} {acumulado}')
+
+            progresso = dict(self._progresso)
+        if progresso:
+            metrica("cnpja_lote_concluidos", "gauge", "CNPJs concluídos no lote atual", [((), progresso["concluidos"])])
+            metrica("cnpja_lote_total", "gauge", "CNPJs no lote atual", [((), progresso["total"])])
+            if progresso["vazao"] is not None:
+                metrica("cnpja_lote_vazao", "gauge", "CNPJs por segundo (média móvel exponencial)",
+                        [((), round(progresso["vazao"], 6))])
+            if progresso["tempo_restante"] is not None:
+                metrica("cnpja_lote_tempo_restante_segundos", "gauge", "Estimativa de tempo até o fim do lote",
+                        [((), round(progresso["tempo_restante"], 3))])
+        return "\n".join(linhas) + "\n"
+
+    def _emitir(self, evento: dict) -> None:
+        for callback in list(self._assinantes):
+            try:
+                callback(evento)
+            except Exception:
+                # Um assinante com defeito não pode derrubar a consulta em andamento
+                pass
+
+
+class EstimadorVazao:
+    """
+    Vazão (CNPJs/s) por média móvel exponencial e tempo restante estimado de um lote.
+
+    A vazão é recalculada no máximo a cada `intervalo` segundos, o que suaviza rajadas de
+    conclusões simultâneas (lotes concorrentes) e pausas do limitador de taxa.
+
+    Args:
+        total (int): Quantidade de CNPJs do lote
+        alfa (float): Peso da medição mais recente (0-1)
+        intervalo (float): Intervalo mínimo, em segundos, entre medições
+    """
+
+    def __init__(self, total: int, alfa: float = 0.3, intervalo: float = 1.0):
+        self.total = total
+        self.alfa = alfa
+        self.intervalo = intervalo
+        self.vazao = None
+        self._inicio = time.monotonic()
+        self._ultima_medicao = self._inicio
+        self._ultimos_concluidos = 0
+        self._medicoes = 0
+
+    def registrar(self, concluidos: int) -> None:
+        agora = time.monotonic()
+        decorrido = agora - self._ultima_medicao
+        if decorrido < self.intervalo:
+            if self.vazao is None and agora > self._inicio:
+                # Até a primeira medição completa usa a média desde o início
+                self.vazao = concluidos / (agora - self._inicio)
+            return
+
+        instantanea = (concluidos - self._ultimos_concluidos) / decorrido
+        if not self._medicoes:
+            self.vazao = instantanea
+        else:
+            self.vazao = self.alfa * instantanea + (1 - self.alfa) * self.vazao
+        self._medicoes += 1
+        self._ultima_medicao = agora
+        self._ultimos_concluidos = concluidos
+
+    def tempo_restante(self, concluidos: int) -> float:
+        if not self.vazao:
+            return None
+        return (self.total - concluidos) / self.vazao
@@ -0,0 +1,179 @@
+import threading
+import time
+
+from cnpja_api.cnpja_api import CNPJaAPI
+from cnpja_api.cnpja_cache import CacheRespostas
+from cnpja_api.cnpja_exceptions import (
+    CNPJaAuthError,
+    CNPJaConnectionError,
+    CNPJaCreditError,
+    CNPJaRateLimitError,
+    CNPJaServerError,
+)
+from cnpja_api.cnpja_rate_limiter import obter_limitador
+
+
+class CNPJaPoolAPI(CNPJaAPI):
+    """
+    Cliente da API CNPJa que distribui as consultas entre várias chaves.
+
+    Cada chave tem sua própria sessão e seu próprio limitador de taxa (compartilhado no processo
+    por chave). A cada requisição é escolhida a chave que pode ser usada mais cedo e, em caso de
+    empate, a com mais créditos. Chaves que respondem 429 são penalizadas no limitador e a
+    requisição segue por outra chave; chaves sem créditos (402) ou recusadas (401/403) saem do
+    rodízio até a próxima verificação de saldo que mostre créditos disponíveis. Chaves com
+    Retry-After longo ficam fora até o fim do prazo; se todas estiverem nessa situação, é lançado
+    CNPJaRateLimitError com `retry_after` até a primeira voltar.
+
+    Pode ser usado no lugar de CNPJaAPI em CNPJaLoteConsulta e AsyncCNPJaAPI.
+
+    Args:
+        api_keys (list[str]): Chaves da API
+        consultas_por_minuto (int | list[int]): Limite por minuto de cada chave (um valor para todas ou um por chave)
+        intervalo_saldo (float): Segundos entre verificações do saldo de créditos de cada chave
+        saldo_minimo (int): Abaixo deste saldo a chave deixa de receber consultas
+        cache (CacheRespostas, optional): Cache local compartilhado por todas as chaves
+        **kwargs: Parâmetros de sessão repassados a cada CNPJaAPI (tamanho_pool, timeout, backoff...)
+    """
+
+    def __init__(self, api_keys: list[str], consultas_por_minuto=10, intervalo_saldo: float = 300,
+                 saldo_minimo: int = 1, cache: CacheRespostas = None, **kwargs):
+        if not api_keys:
+            raise ValueError("Informe ao menos uma chave da API.")
+        if isinstance(consultas_por_minuto, int):
+            consultas_por_minuto = [consultas_por_minuto] * len(api_keys)
+        if len(consultas_por_minuto) != len(api_keys):
+            raise ValueError("Informe um limite de consultas por minuto para cada chave.")
+
+        super().__init__(api_keys[0], cache=cache, **kwargs)
+        # As novas tentativas são feitas pelo pool, que pode trocar de chave entre elas
+        kwargs["max_tentativas"] = 0
+        self.clientes = [
+            CNPJaAPI(chave, limitador=obter_limitador(chave, limite), **kwargs)
+            for chave, limite in zip(api_keys, consultas_por_minuto)
+        ]
+        self.intervalo_saldo = intervalo_saldo
+        self.saldo_minimo = saldo_minimo
+
+        self._lock = threading.Lock()
+        self._saldos = [None] * len(self.clientes)
+        # Suspensões por crédito/autenticação e bloqueios por Retry-After (429) têm prazos separados:
+        # a verificação de saldo só encerra as primeiras
+        self._suspensa_ate = [0.0] * len(self.clientes)
+        self._bloqueada_ate = [0.0] * len(self.clientes)
+        self._saldo_verificado = [0.0] * len(self.clientes)
+
+    def consultar_saldo(self) -> dict:
+        """Saldo somado de todas as chaves, com o detalhe de cada uma em "chaves"."""
+        saldos = [self._verificar_saldo(indice) for indice in range(len(self.clientes))]
+        return {
+            "perpetual": sum(saldo.get("perpetual", 0) for saldo in saldos if saldo),
+            "transient": sum(saldo.get("transient", 0) for saldo in saldos if saldo),
+            "chaves": saldos,
+        }
+
+    def ajustar_pool(self, tamanho_pool: int) -> None:
+        # As requisições saem pelos clientes de cada chave, e qualquer um deles pode receber todas.
+        # No __init__ da classe base os clientes ainda não existem (são criados com o mesmo tamanho)
+        super().ajustar_pool(tamanho_pool)
+        for cliente in getattr(self, "clientes", []):
+            cliente.ajustar_pool(tamanho_pool)
+
+    def close(self) -> None:
+        super().close()
+        for cliente in self.clientes:
+            cliente.close()
+
+    def _requisitar(self, url: str) -> dict:
+        # Um 429 apenas troca de chave; só falhas de servidor/rede consomem as tentativas com backoff
+        tentativa = 0
+        trocas = 0
+        while True:
+            indice = self._escolher_chave()
+            cliente = self.clientes[indice]
+            try:
+                dados = cliente._requisitar(url)
+            except CNPJaRateLimitError as e:
+                if self._espera_excessiva(e):
+                    # Chave bloqueada por muito tempo: fica fora da escolha em vez de segurar o limitador
+                    self._bloquear(indice, e.retry_after)
+                else:
+                    cliente.limitador.penalizar(e.retry_after)
+                trocas += 1
+                if trocas > len(self.clientes) * (self.max_tentativas + 1):
+                    raise
+            except (CNPJaCreditError, CNPJaAuthError):
+                self._suspender(indice)
+                trocas += 1
+                if trocas > len(self.clientes) * (self.max_tentativas + 1):
+                    raise
+            except (CNPJaServerError, CNPJaConnectionError) as e:
+                if tentativa >= self.max_tentativas or self._espera_excessiva(e):
+                    raise
+                time.sleep(self._tempo_backoff(tentativa, e.retry_after))
+                tentativa += 1
+            else:
+                with self._lock:
+                    # Estimativa local até a próxima verificação de saldo
+                    if self._saldos[indice] is not None:
+                        self._saldos[indice] -= 1
+                return dados
+            if self.metricas:
+                self.metricas.registrar_nova_tentativa(url)
+
+    def _escolher_chave(self) -> int:
+        agora = time.monotonic()
+        with self._lock:
+            vencidas = [i for i in range(len(self.clientes)) if agora - self._saldo_verificado[i] >= self.intervalo_saldo]
+            for indice in vencidas:
+                self._saldo_verificado[indice] = agora
+        for indice in vencidas:
+            self._verificar_saldo(indice)
+
+        with self._lock:
+            com_credito = [i for i in range(len(self.clientes)) if self._suspensa_ate[i] <= agora]
+            disponiveis = [i for i in com_credito if self._bloqueada_ate[i] <= agora]
+            if not disponiveis:
+                if com_credito:
+                    # Bloqueio temporário pelo limite de requisições, não falta de créditos
+                    raise CNPJaRateLimitError(
+                        429, "Todas as chaves da API bloqueadas pelo limite de requisições.",
+                        retry_after=min(self._bloqueada_ate[i] for i in com_credito) - agora
+                    )
+                raise CNPJaCreditError(mensagem="Nenhuma chave da API disponível (sem créditos ou sem acesso).")
+            return min(
+                disponiveis,
+                key=lambda i: (self.clientes[i].limitador.tempo_espera(), -(self._saldos[i] or 0))
+            )
+
+    def _verificar_saldo(self, indice: int) -> dict:
+        with self._lock:
+            self._saldo_verificado[indice] = time.monotonic()
+        try:
+            saldo = self.clientes[indice].consultar_saldo()
+        except (CNPJaAuthError, CNPJaCreditError):
+            self._suspender(indice)
+            return None
+        except Exception:
+            # Falha temporária na verificação: mantém o estado atual da chave
+            return None
+
+        total = saldo.get("perpetual", 0) + saldo.get("transient", 0)
+        with self._lock:
+            self._saldos[indice] = total
+            if total < self.saldo_minimo:
+                self._suspensa_ate[indice] = time.monotonic() + self.intervalo_saldo
+            else:
+                self._suspensa_ate[indice] = 0.0
+        return saldo
+
+    def _suspender(self, indice: int) -> None:
+        with self._lock:
+            self._suspensa_ate[indice] = time.monotonic() + self.intervalo_saldo
+            # Força nova verificação de saldo ao fim da suspensão
+            self._saldo_verificado[indice] = time.monotonic()
+
+    def _bloquear(self, indice: int, segundos: float) -> None:
+        # Mantém o prazo mais tardio entre bloqueios sucessivos
+        with self._lock:
+            self._bloqueada_ate[indice] = max(self._bloqueada_ate[indice], time.monotonic() + segundos)
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa do tipo token bucket, seguro para threads.
+
+    Cada requisição consome uma ficha; as fichas são repostas continuamente à taxa de
+    `por_minuto` / 60 por segundo, acumulando no máximo `rajada` fichas. Reservas feitas sem
+    fichas disponíveis ficam "devendo" e esperam na ordem em que foram feitas.
+
+    Como a rajada se soma à reposição, o token bucket sozinho permitiria até `rajada` + `por_minuto`
+    requisições em 60 s após um período ocioso. Por isso os horários das últimas `por_minuto`
+    reservas também são mantidos (janela deslizante) e nenhum intervalo de 60 s passa do limite.
+
+    Quando o servidor sinaliza limite excedido (`penalizar`), a taxa é reduzida pela metade e
+    nenhuma ficha é reposta até o fim do Retry-After; cada sucesso (`registrar_sucesso`)
+    recupera a taxa aos poucos até o limite configurado.
+
+    Args:
+        por_minuto (int): Requisições permitidas por minuto pelo plano
+        rajada (int, optional): Máximo de requisições em sequência sem espera. Padrão: 1/10 de `por_minuto`
+    """
+
+    FATOR_REDUCAO = 0.5
+    TAXA_MINIMA = 0.1      # fração mínima da taxa configurada após penalizações
+    RECUPERACAO = 0.05     # fração da taxa configurada recuperada a cada sucesso
+    JANELA = 60.0          # segundos da janela em que vale o limite por minuto
+
+    def __init__(self, por_minuto: int, rajada: int = None):
+        self._lock = threading.Lock()
+        self._reservas = deque()
+        self._rajada = rajada
+        self._taxa = None
+        self._fichas = None
+        self.ajustar_limite(por_minuto)
+        self._fichas = self.capacidade
+        self._atualizado = time.monotonic()
+
+    def ajustar_limite(self, por_minuto: int) -> None:
+        """Altera o limite por minuto (ex: outro lote com a mesma chave e um plano diferente)."""
+        if por_minuto <= 0:
+            raise ValueError("O limite de requisições por minuto deve ser positivo.")
+        with self._lock:
+            self.por_minuto = por_minuto
+            self.capacidade = float(self._rajada or max(1, por_minuto // 10))
+            # Uma redução em andamento por penalização é mantida na mesma proporção do novo limite
+            proporcao = 1.0 if self._taxa is None else self._taxa / self._taxa_base
+            self._taxa_base = por_minuto / 60
+            self._taxa = self._taxa_base * proporcao
+            if self._fichas is not None:
+                self._fichas = min(self._fichas, self.capacidade)
+
+    @property
+    def taxa_atual(self) -> float:
+        """Requisições por minuto permitidas no momento (menor que `por_minuto` após penalizações)."""
+        return self._taxa * 60
+
+    def adquirir(self) -> None:
+        """Bloqueia a thread atual até que a requisição possa ser feita."""
+        espera = self._reservar()
+        if espera > 0:
+            time.sleep(espera)
+
+    def tempo_espera(self) -> float:
+        """Segundos que uma nova requisição esperaria agora, sem consumir fichas."""
+        with self._lock:
+            agora = time.monotonic()
+            self._reabastecer(agora)
+            espera = max(0.0, self._atualizado - agora)
+            if self._fichas < 1:
+                espera += (1 - self._fichas) / self._taxa
+            return max(espera, self._espera_janela(agora))
+
+    def penalizar(self, retry_after: float = None) -> None:
+        """Reduz a taxa após uma resposta 429 e suspende a reposição durante o Retry-After."""
+        with self._lock:
+            agora = time.monotonic()
+            self._reabastecer(agora)
+            self._taxa = max(self._taxa * self.FATOR_REDUCAO, self._taxa_base * self.TAXA_MINIMA)
+            self._fichas = min(self._fichas, 0.0)
+            pausa = retry_after if retry_after is not None else 1 / self._taxa
+            self._atualizado = max(self._atualizado, agora + pausa)
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            if self._taxa < self._taxa_base:
+                self._taxa = min(self._taxa_base, self._taxa + self._taxa_base * self.RECUPERACAO)
+
+    def _reservar(self) -> float:
+        """Consome uma ficha e retorna quantos segundos o chamador deve esperar antes de usá-la."""
+        with self._lock:
+            agora = time.monotonic()
+            self._reabastecer(agora)
+            self._fichas -= 1
+            espera = max(0.0, self._atualizado - agora)
+            if self._fichas < 0:
+                espera += -self._fichas / self._taxa
+            espera = max(espera, self._espera_janela(agora))
+            # Reservas saem em ordem: a janela guarda os horários das últimas `por_minuto`
+            if self._reservas:
+                espera = max(espera, self._reservas[-1] - agora)
+            self._reservas.append(agora + espera)
+            while len(self._reservas) > self.por_minuto or self._reservas[0] <= agora - self.JANELA:
+                self._reservas.popleft()
+            return espera
+
+    def _espera_janela(self, agora: float) -> float:
+        # Com `por_minuto` reservas na janela, a próxima espera a mais antiga completar 60 s
+        if len(self._reservas) < self.por_minuto:
+            return 0.0
+        return max(0.0, self._reservas[-self.por_minuto] + self.JANELA - agora)
+
+    def _reabastecer(self, agora: float) -> None:
+        # Durante uma penalização `_atualizado` fica no futuro e nada é reposto
+        if agora > self._atualizado:
+            self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self._taxa)
+            self._atualizado = agora
+
+
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+
+def obter_limitador(chave: str, por_minuto: int) -> LimitadorTaxa:
+    """
+    Retorna o limitador compartilhado do processo para a chave informada (normalmente a chave da API),
+    criando-o na primeira chamada. Lotes que usam a mesma chave dividem a mesma cota; se `por_minuto`
+    mudar, o limite do limitador existente é ajustado e vale para todos eles.
+    """
+    with _limitadores_lock:
+        limitador = _limitadores.get(chave)
+        if limitador is None:
+            limitador = LimitadorTaxa(por_minuto)
+            _limitadores[chave] = limitador
+        elif limitador.por_minuto != por_minuto:
+            limitador.ajustar_limite(por_minuto)
+        return limitador
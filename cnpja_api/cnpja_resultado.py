@@ -0,0 +1,131 @@
+from typing import Iterable, Iterator, List
+
+import pandas as pd
+
+from cnpja_api.cnpja_api import CNPJaAPI
+from cnpja_api.cnpja_exportacao import COLUNAS_REG
+
+
+class LoteResultado:
+    """
+    Registros de um lote armazenados em colunas, separados por tipo de REG.
+
+    Cada REG tem seu próprio conjunto de colunas (listas de valores), preenchido incrementalmente
+    à medida que os registros chegam. Os DataFrames por REG são montados direto das colunas, sem
+    percorrer os demais registros, e ficam em cache até o REG receber novos registros.
+
+    Também pode ser iterado como a antiga lista de dicts (agrupado por REG, na ordem em que
+    cada REG apareceu), o que mantém compatíveis os códigos que esperam uma lista.
+
+    Args:
+        registros (Iterable[dict], optional): Registros iniciais
+    """
+
+    __slots__ = ("_colunas", "_tamanhos", "_por_cnpj", "_dataframes")
+
+    def __init__(self, registros: Iterable[dict] = None):
+        self._colunas = {}
+        self._tamanhos = {}
+        self._por_cnpj = {}
+        self._dataframes = {}
+        if registros:
+            self.extend(registros)
+
+    @property
+    def regs(self) -> List[str]:
+        """Tipos de REG presentes, na ordem em que apareceram."""
+        return list(self._colunas)
+
+    def append(self, registro: dict) -> None:
+        reg = registro["REG"]
+        colunas = self._colunas.get(reg)
+        if colunas is None:
+            # A coluna REG é implícita: não é armazenada por linha
+            colunas = {coluna: [] for coluna in COLUNAS_REG.get(reg, ()) if coluna != "REG"}
+            self._colunas[reg] = colunas
+            self._tamanhos[reg] = 0
+
+        indice = self._tamanhos[reg]
+        for coluna in registro:
+            if coluna not in colunas and coluna != "REG":
+                colunas[coluna] = [None] * indice
+        for coluna, valores in colunas.items():
+            valores.append(registro.get(coluna))
+        self._tamanhos[reg] = indice + 1
+
+        cnpj = registro.get("CNPJ")
+        if cnpj:
+            self._por_cnpj.setdefault(CNPJaAPI._normalize_taxid(str(cnpj)), []).append((reg, indice))
+        self._dataframes.pop(reg, None)
+
+    def extend(self, registros: Iterable[dict]) -> None:
+        for registro in registros:
+            self.append(registro)
+
+    def adicionar_colunas(self, reg: str, colunas: dict) -> None:
+        """
+        Acrescenta várias linhas de um REG já em colunas ({coluna: [valores]}, sem a coluna REG),
+        como as geradas por EsquemaRegistros.achatar, sem montar um dict por linha.
+        """
+        quantidade = len(next(iter(colunas.values()), ()))
+        if not quantidade:
+            return
+        atuais = self._colunas.get(reg)
+        if atuais is None:
+            atuais = {coluna: [] for coluna in COLUNAS_REG.get(reg, ()) if coluna != "REG"}
+            self._colunas[reg] = atuais
+            self._tamanhos[reg] = 0
+
+        inicio = self._tamanhos[reg]
+        for coluna in colunas:
+            if coluna not in atuais and coluna != "REG":
+                atuais[coluna] = [None] * inicio
+        for coluna, valores in atuais.items():
+            valores.extend(colunas.get(coluna) or [None] * quantidade)
+        self._tamanhos[reg] = inicio + quantidade
+
+        for indice, cnpj in enumerate(colunas.get("CNPJ") or (), start=inicio):
+            if cnpj:
+                self._por_cnpj.setdefault(CNPJaAPI._normalize_taxid(str(cnpj)), []).append((reg, indice))
+        self._dataframes.pop(reg, None)
+
+    def dataframe(self, reg: str) -> pd.DataFrame:
+        """
+        DataFrame do REG informado, sem colunas totalmente vazias e com vazios como "".
+        Retorna um DataFrame vazio se o REG não estiver presente.
+        """
+        df = self._dataframes.get(reg)
+        if df is None:
+            colunas = self._colunas.get(reg)
+            if colunas is None:
+                return pd.DataFrame()
+            df = pd.DataFrame({"REG": [reg] * self._tamanhos[reg], **colunas})
+            df = df.dropna(axis=1, how="all").fillna("")
+            self._dataframes[reg] = df
+        return df
+
+    def dataframes(self) -> dict:
+        """DataFrames de todos os REG, indexados pelo código do REG."""
+        return {reg: self.dataframe(reg) for reg in self._colunas}
+
+    def por_cnpj(self, cnpj: str) -> List[dict]:
+        """Registros de um CNPJ (com ou sem pontuação), em todos os REG."""
+        return [self._linha(reg, indice) for reg, indice in self._por_cnpj.get(CNPJaAPI._normalize_taxid(cnpj), [])]
+
+    def __iter__(self) -> Iterator[dict]:
+        for reg in self._colunas:
+            for indice in range(self._tamanhos[reg]):
+                yield self._linha(reg, indice)
+
+    def __len__(self) -> int:
+        return sum(self._tamanhos.values())
+
+    def __repr__(self) -> str:
+        contagem = ", ".join(f"{reg}={total}" for reg, total in self._tamanhos.items())
+        return f"LoteResultado({contagem})"
+
+    def _linha(self, reg: str, indice: int) -> dict:
+        linha = {"REG": reg}
+        for coluna, valores in self._colunas[reg].items():
+            linha[coluna] = valores[indice]
+        return linha
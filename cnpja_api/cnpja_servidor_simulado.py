@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class ServidorSimulado:
+    """
+    Servidor HTTP local que imita a API CNPJa, para medir o desempenho do cliente sem gastar créditos.
+
+    Atende /office, /simples, /rfb, /credit e /person com respostas sintéticas (determinísticas
+    por CNPJ) ou gravadas, com latência, taxa de erros 5xx e taxa de respostas 429 configuráveis.
+
+    Args:
+        porta (int): Porta local. 0 escolhe uma porta livre
+        latencia (float): Latência média, em segundos, de cada resposta
+        variacao_latencia (float): Variação máxima (±) aplicada à latência, em segundos
+        taxa_erro (float): Fração das respostas com HTTP 503
+        taxa_limite (float): Fração das respostas com HTTP 429
+        retry_after (float): Valor do cabeçalho Retry-After nas respostas 429
+        gravacoes (str, optional): Diretório com respostas gravadas ({cnpj}.json), usadas no lugar das sintéticas
+        semente (int, optional): Semente dos sorteios de latência e erros
+    """
+
+    def __init__(self, porta: int = 0, latencia: float = 0.0, variacao_latencia: float = 0.0,
+                 taxa_erro: float = 0.0, taxa_limite: float = 0.0, retry_after: float = 1.0,
+                 gravacoes: str = None, semente: int = None):
+        self.latencia = latencia
+        self.variacao_latencia = variacao_latencia
+        self.taxa_erro = taxa_erro
+        self.taxa_limite = taxa_limite
+        self.retry_after = retry_after
+        self.gravacoes = gravacoes
+        self.requisicoes = 0
+
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        servidor = self
+
+        class Manipulador(_ManipuladorCNPJa):
+            simulado = servidor
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", porta), Manipulador)
+        self._http.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self) -> "ServidorSimulado":
+        """Atende as requisições em uma thread em segundo plano."""
+        self._thread = threading.Thread(target=self._http.serve_forever, name="cnpja-simulado", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def sortear(self) -> tuple:
+        """Sorteia (latência, status) de uma resposta conforme as taxas configuradas."""
+        with self._lock:
+            self.requisicoes += 1
+            latencia = self.latencia + self._aleatorio.uniform(-self.variacao_latencia, self.variacao_latencia)
+            sorteio = self._aleatorio.random()
+        if sorteio < self.taxa_limite:
+            return max(0.0, latencia), 429
+        if sorteio < self.taxa_limite + self.taxa_erro:
+            return max(0.0, latencia), 503
+        return max(0.0, latencia), 200
+
+    def estabelecimento(self, cnpj: str, simples: bool = False, registrations: list = None) -> dict:
+        """Resposta de /office/{cnpj}: gravada, se existir, ou sintética."""
+        gravada = self._carregar_gravacao(cnpj)
+        if gravada is not None:
+            return gravada
+
+        semente = int("".join(c for c in cnpj if c.isdigit()) or 0)
+        membros = [
+            {
+                "since": "2015-03-10",
+                "role": {"id": 49, "text": "Sócio-Administrador"},
+                "person": {"name": f"SOCIO {indice} DA EMPRESA {cnpj}", "age": "41-50",
+                           "taxId": f"***{semente % 1000:03d}{indice:03d}**"},
+            }
+            for indice in range(1 + semente % 3)
+        ]
+        dados = {
+            "updated": "2024-05-01T12:00:00.000Z",
+            "taxId": cnpj,
+            "alias": f"FANTASIA {cnpj}",
+            "founded": "2010-01-15",
+            "head": True,
+            "status": {"id": 2, "text": "Ativa"},
+            "address": {
+                "city": "São Paulo", "state": "SP", "zip": "01310100",
+                "country": {"id": 76, "name": "Brasil"},
+            },
+            "mainActivity": {"id": 6201501, "text": "Desenvolvimento de programas de computador sob encomenda"},
+            "sideActivities": [
+                {"id": 6202300 + indice, "text": f"Atividade secundária {indice}"} for indice in range(semente % 4)
+            ],
+            "company": {
+                "id": semente // 1_000_000,
+                "name": f"EMPRESA SIMULADA {cnpj} LTDA",
+                "equity": float(semente % 1_000_000),
+                "nature": {"id": 2062, "text": "Sociedade Empresária Limitada"},
+                "size": {"id": 3, "acronym": "DEMAIS", "text": "Demais"},
+                "members": membros,
+            },
+        }
+        if simples:
+            dados["company"]["simples"] = {"optant": semente % 2 == 0, "since": "2018-01-01"}
+            dados["company"]["simei"] = {"optant": False, "since": None}
+        if registrations:
+            dados["registrations"] = [
+                {
+                    "number": f"{semente % 1_000_000_000:09d}", "state": estado, "enabled": True,
+                    "statusDate": "2012-07-01", "status": {"id": 1, "text": "Sem restrição"},
+                    "type": {"id": 1, "text": "IE Normal"},
+                }
+                for estado in registrations[:1]
+            ]
+        return dados
+
+    def simples(self, cnpj: str) -> dict:
+        dados = self.estabelecimento(cnpj, simples=True)
+        return {
+            "taxId": cnpj,
+            "updated": dados["updated"],
+            "simples": dados["company"].get("simples", {}),
+            "simei": dados["company"].get("simei", {}),
+        }
+
+    def _carregar_gravacao(self, cnpj: str) -> dict:
+        if not self.gravacoes:
+            return None
+        try:
+            with open(os.path.join(self.gravacoes, f"{cnpj}.json"), encoding="utf-8") as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return None
+
+
+class _ManipuladorCNPJa(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre requisições, como a API real
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas: com o algoritmo de Nagle, o corpo esperaria o
+    # ACK atrasado do cliente (~40 ms por requisição) e as latências medidas seriam desse artefato
+    disable_nagle_algorithm = True
+    simulado: ServidorSimulado = None
+
+    def do_GET(self):
+        latencia, status = self.simulado.sortear()
+        if latencia:
+            time.sleep(latencia)
+        if status == 429:
+            return self._responder(429, {"message": "Too Many Requests"}, {"Retry-After": str(self.simulado.retry_after)})
+        if status != 200:
+            return self._responder(status, {"message": "Service Unavailable"})
+
+        partes = urlsplit(self.path)
+        segmentos = [s for s in partes.path.split("/") if s]
+        parametros = parse_qs(partes.query)
+        endpoint = segmentos[0] if segmentos else ""
+
+        if endpoint == "office" and len(segmentos) > 1:
+            registrations = parametros.get("registrations", [""])[0]
+            dados = self.simulado.estabelecimento(
+                segmentos[1],
+                simples=parametros.get("simples", ["false"])[0] == "true",
+                registrations=registrations.split(",") if registrations else None,
+            )
+        elif endpoint == "office":
+            nomes = ",".join(parametros.get("company.name.in", [])).split(",")
+            dados = {"records": [self.simulado.estabelecimento(f"{indice:014d}") for indice, _ in enumerate(nomes)]}
+        elif endpoint == "person":
+            cpfs = ",".join(parametros.get("taxId.in", [])).split(",")
+            dados = {"records": [{"taxId": cpf, "name": f"PESSOA {cpf}"} for cpf in cpfs if cpf]}
+        elif endpoint in ("simples", "rfb"):
+            cnpj = parametros.get("taxId", [""])[0]
+            dados = self.simulado.simples(cnpj) if endpoint == "simples" else self.simulado.estabelecimento(cnpj)
+        elif endpoint == "credit":
+            dados = {"perpetual": 1_000_000, "transient": 0}
+        else:
+            return self._responder(404, {"message": "Not Found"})
+        self._responder(200, dados)
+
+    def _responder(self, status: int, dados: dict, cabecalhos: dict = None) -> None:
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        # Sem log por requisição: em benchmarks ele custaria mais que a própria resposta
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que simula a API CNPJa.")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latência média (segundos)")
+    parser.add_argument("--variacao-latencia", type=float, default=0.02, help="Variação da latência (segundos)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Fração de respostas 503")
+    parser.add_argument("--taxa-limite", type=float, default=0.0, help="Fração de respostas 429")
+    parser.add_argument("--gravacoes", help="Diretório com respostas gravadas ({cnpj}.json)")
+    args = parser.parse_args()
+
+    servidor = ServidorSimulado(
+        porta=args.porta, latencia=args.latencia, variacao_latencia=args.variacao_latencia,
+        taxa_erro=args.taxa_erro, taxa_limite=args.taxa_limite, gravacoes=args.gravacoes,
+    )
+    print(f"Servidor simulado em {servidor.url} (Ctrl+C para encerrar)")
+    try:
+        servidor._http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._http.server_close()
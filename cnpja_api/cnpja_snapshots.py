@@ -0,0 +1,216 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List
+
+from cnpja_api.cnpja_diario import DiarioLote
+from cnpja_api.cnpja_esquema import simples_do_estabelecimento
+
+
+class SnapshotsCNPJ:
+    """
+    Último retrato conhecido de cada CNPJ (respostas brutas da API, no formato das entradas do
+    DiarioLote), em SQLite, para atualizações incrementais da base.
+
+    Em uma atualização, CNPJs com retrato mais recente que a idade máxima não são consultados de
+    novo; os demais são consultados e comparados com o retrato anterior (ver detectar_alteracoes).
+
+    Args:
+        caminho (str): Arquivo SQLite. Padrão: apenas em memória
+    """
+
+    # Máximo de parâmetros por consulta "IN" (limite padrão do SQLite é 999)
+    TAMANHO_LOTE_SQL = 500
+
+    def __init__(self, caminho: str = ":memory:"):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " cnpj TEXT PRIMARY KEY, dados TEXT NOT NULL, consultado REAL NOT NULL)"
+        )
+
+    def obter(self, cnpj: str) -> dict:
+        """Retorna a entrada gravada para o CNPJ (normalizado) ou None."""
+        with self._lock:
+            linha = self._conexao.execute("SELECT dados FROM snapshots WHERE cnpj = ?", (cnpj,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def recentes(self, cnpjs: Iterable[str], idade_maxima_dias: float) -> dict:
+        """
+        CNPJs (normalizados) com retrato de no máximo `idade_maxima_dias`, com o instante do retrato
+        (epoch). Só os instantes são carregados: as respostas são lidas com `obter` quando usadas.
+        """
+        limite = time.time() - idade_maxima_dias * 86_400
+        cnpjs = list(cnpjs)
+        instantes = {}
+        with self._lock:
+            for inicio in range(0, len(cnpjs), self.TAMANHO_LOTE_SQL):
+                lote = cnpjs[inicio:inicio + self.TAMANHO_LOTE_SQL]
+                marcadores = ",".join("?" * len(lote))
+                instantes.update(self._conexao.execute(
+                    f"SELECT cnpj, consultado FROM snapshots WHERE consultado >= ? AND cnpj IN ({marcadores})",
+                    (limite, *lote)
+                ))
+        return instantes
+
+    def salvar(self, cnpj: str, entrada: dict) -> None:
+        """
+        Substitui o retrato do CNPJ. Entradas com falha ("erro") não são gravadas.
+
+        O instante do retrato é o da atualização dos dados na API (`updated`), quando anterior ao
+        da consulta: com `maxAge`, a API pode devolver dados que já tinham até N dias.
+        """
+        if "erro" in entrada:
+            return
+        consultado = min(time.time(), _atualizado_em(entrada.get("dados")) or float("inf"))
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO snapshots (cnpj, dados, consultado) VALUES (?, ?, ?)",
+                (cnpj, json.dumps(entrada, ensure_ascii=False), consultado)
+            )
+
+    def atualizar(self, cnpj: str, entrada: dict) -> List[dict]:
+        """Grava o novo retrato do CNPJ e retorna as alterações em relação ao anterior (REG 700)."""
+        anterior = self.obter(cnpj)
+        self.salvar(cnpj, entrada)
+        if anterior is None or "erro" in entrada:
+            return []
+        return detectar_alteracoes(DiarioLote.respostas(anterior), DiarioLote.respostas(entrada))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def detectar_alteracoes(anterior: tuple, atual: tuple) -> List[dict]:
+    """
+    Compara dois retratos de um CNPJ e retorna uma linha REG 700 por alteração em situação
+    cadastral, CNAEs, quadro societário, Simples/SIMEI e inscrições estaduais.
+
+    Simples e inscrições só são comparados quando presentes nos dois retratos.
+
+    Args:
+        anterior (tuple): Respostas do retrato anterior, como as de DiarioLote.respostas
+        atual (tuple): Respostas da consulta atual, no mesmo formato
+
+    Returns:
+        List[dict]: Registros {"REG": "700", "CNPJ", "Campo", "Anterior", "Atual"}
+    """
+    dados_anterior, simples_anterior, contribuintes_anterior, verificou_simples, verificou_contribuintes = anterior
+    dados_atual, simples_atual, contribuintes_atual, verificar_simples, verificar_contribuintes = atual
+    dados_anterior = dados_anterior or {}
+    dados_atual = dados_atual or {}
+    cnpj = dados_atual.get("taxId") or dados_anterior.get("taxId")
+    alteracoes = []
+
+    def alterou(campo, valor_anterior, valor_atual):
+        if valor_anterior != valor_atual:
+            alteracoes.append({
+                "REG": "700", "CNPJ": cnpj, "Campo": campo,
+                "Anterior": "" if valor_anterior is None else valor_anterior,
+                "Atual": "" if valor_atual is None else valor_atual,
+            })
+
+    def conjunto(campo, itens_anterior, itens_atual):
+        # Itens incluídos aparecem só em "Atual" e os removidos só em "Anterior"
+        for item in sorted(itens_anterior - itens_atual):
+            alterou(campo, item, "")
+        for item in sorted(itens_atual - itens_anterior):
+            alterou(campo, "", item)
+
+    alterou("Situação Cadastral", _texto(dados_anterior, "status"), _texto(dados_atual, "status"))
+    alterou("CNAE Principal", _atividade(dados_anterior.get("mainActivity")), _atividade(dados_atual.get("mainActivity")))
+    conjunto("CNAE Secundário", _atividades(dados_anterior), _atividades(dados_atual))
+    conjunto("Sócio", _socios(dados_anterior), _socios(dados_atual))
+
+    if verificou_simples and verificar_simples:
+        simples_anterior = _simples(dados_anterior, simples_anterior)
+        simples_atual = _simples(dados_atual, simples_atual)
+        if simples_anterior is not None and simples_atual is not None:
+            for chave, campo in (("simples", "Simples Nacional"), ("simei", "SIMEI")):
+                alterou(campo, _optante(simples_anterior, chave), _optante(simples_atual, chave))
+
+    if verificou_contribuintes and verificar_contribuintes:
+        inscricoes_anterior = _inscricoes(dados_anterior, contribuintes_anterior)
+        inscricoes_atual = _inscricoes(dados_atual, contribuintes_atual)
+        if inscricoes_anterior is not None and inscricoes_atual is not None:
+            for inscricao in sorted(set(inscricoes_anterior) | set(inscricoes_atual)):
+                alterou(f"Inscrição Estadual {inscricao}", inscricoes_anterior.get(inscricao, ""),
+                        inscricoes_atual.get(inscricao, ""))
+    return alteracoes
+
+
+def _atualizado_em(dados: dict) -> float:
+    # "updated" vem em ISO 8601 UTC (ex: "2024-05-01T12:00:00.000Z"); None se ausente ou inválido
+    atualizado = (dados or {}).get("updated")
+    if not isinstance(atualizado, str):
+        return None
+    try:
+        instante = datetime.fromisoformat(atualizado.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if instante.tzinfo is None:
+        instante = instante.replace(tzinfo=timezone.utc)
+    return instante.timestamp()
+
+
+def _texto(dados: dict, chave: str) -> str:
+    return (dados.get(chave) or {}).get("text")
+
+
+def _atividade(atividade: dict) -> str:
+    if not atividade:
+        return None
+    return f"{atividade.get('id')} - {atividade.get('text', '')}"
+
+
+def _atividades(dados: dict) -> set:
+    return {_atividade(atividade) for atividade in dados.get("sideActivities") or [] if atividade}
+
+
+def _socios(dados: dict) -> set:
+    return {
+        f"{(membro.get('person') or {}).get('name', '')} ({(membro.get('role') or {}).get('text', '')})"
+        for membro in (dados.get("company") or {}).get("members") or []
+    }
+
+
+def _simples(dados: dict, simples) -> dict:
+    # Falhas da consulta ao Simples (exceções) não entram na comparação
+    if isinstance(simples, Exception):
+        return None
+    return simples if simples is not None else simples_do_estabelecimento(dados)
+
+
+def _optante(simples: dict, chave: str) -> str:
+    optante = (simples.get(chave) or {}).get("optant")
+    return None if optante is None else "Sim" if optante else "Não"
+
+
+def _inscricoes(dados: dict, contribuintes) -> dict:
+    if isinstance(contribuintes, Exception):
+        return None
+    fonte = contribuintes if contribuintes is not None else dados
+    inscricoes = {}
+    for inscricao in fonte.get("registrations") or []:
+        situacao = (inscricao.get("status") or {}).get("text") or ""
+        ativo = "Ativo" if inscricao.get("enabled") else "Inativo"
+        inscricoes[f"{inscricao.get('state', '')} {inscricao.get('number', '')}"] = f"{situacao} ({ativo})"
+    return inscricoes
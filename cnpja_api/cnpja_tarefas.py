@@ -0,0 +1,177 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from cnpja_api.cnpja_lote_consulta import CNPJaLoteConsulta
+from cnpja_api.cnpja_resultado import LoteResultado
+
+
+class TarefaLote:
+    """
+    Lote em execução (ou já finalizado) no GerenciadorTarefas.
+
+    O progresso é atualizado pela thread do lote e pode ser lido a qualquer momento por outras
+    threads (ex: reruns do Streamlit). Estados: "pendente", "executando", "concluida",
+    "cancelada" e "erro".
+    """
+
+    def __init__(self, id: str, total: int, parametros: dict):
+        self.id = id
+        self.parametros = parametros
+        self.estado = "pendente"
+        self.concluidos = 0
+        self.total = total
+        self.tempo_restante = None
+        self.resultado: LoteResultado = None
+        self.erro: str = None
+        self.criada = time.time()
+        self.iniciada = None
+        self.finalizada = None
+        self._cancelar = threading.Event()
+
+    @property
+    def progresso(self) -> float:
+        """Fração concluída (0 a 1)."""
+        return self.concluidos / self.total if self.total else 0.0
+
+    @property
+    def ativa(self) -> bool:
+        return self.estado in ("pendente", "executando")
+
+    def cancelar(self) -> None:
+        """Pede o cancelamento; o lote para após o CNPJ em andamento e mantém os resultados parciais."""
+        self._cancelar.set()
+
+    def cancelamento_solicitado(self) -> bool:
+        return self._cancelar.is_set()
+
+    def resumo(self) -> dict:
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "concluidos": self.concluidos,
+            "total": self.total,
+            "progresso": self.progresso,
+            "tempo_restante": self.tempo_restante,
+            "erro": self.erro,
+            "criada": self.criada,
+            "iniciada": self.iniciada,
+            "finalizada": self.finalizada,
+        }
+
+    def _atualizar_progresso(self, atual: int, total: int, tempo_restante: float = None) -> None:
+        self.concluidos = atual
+        self.total = total
+        self.tempo_restante = tempo_restante
+
+
+class GerenciadorTarefas:
+    """
+    Executa lotes de CNPJa em segundo plano, em um pool de threads compartilhado pelo processo.
+
+    Cada lote recebe um id; o chamador consulta o progresso com `obter(id)` e pode cancelá-lo
+    com `cancelar(id)` a qualquer momento (cancelamento cooperativo, checado a cada CNPJ).
+    Vários lotes rodam ao mesmo tempo, até `max_tarefas`; os demais aguardam na fila.
+    A cota da API continua sendo respeitada pelo limitador compartilhado de cada chave.
+
+    Args:
+        max_tarefas (int): Lotes executados simultaneamente
+        max_historico (int): Tarefas finalizadas mantidas para consulta (as mais antigas são descartadas)
+    """
+
+    def __init__(self, max_tarefas: int = 4, max_historico: int = 100):
+        self.max_historico = max_historico
+        self._tarefas = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_tarefas, thread_name_prefix="cnpja-lote")
+
+    def iniciar(self, consulta: CNPJaLoteConsulta, cnpjs: List[str], **kwargs) -> str:
+        """
+        Agenda um lote e retorna o id da tarefa imediatamente.
+
+        Args:
+            consulta (CNPJaLoteConsulta): Consulta configurada (API, limite por minuto, cache...)
+            cnpjs (List[str]): CNPJs do lote
+            **kwargs: Parâmetros repassados a consultar_lote (verificar_simples, concorrencia, diario...)
+
+        Returns:
+            str: Id da tarefa
+        """
+        cnpjs = list(cnpjs)
+        tarefa = TarefaLote(uuid.uuid4().hex, len(cnpjs), dict(kwargs))
+        with self._lock:
+            self._tarefas[tarefa.id] = tarefa
+            self._descartar_antigas()
+        self._executor.submit(self._executar, tarefa, consulta, cnpjs, kwargs)
+        return tarefa.id
+
+    def obter(self, id: str) -> TarefaLote:
+        """Tarefa com o id informado ou None se desconhecida (ou já descartada do histórico)."""
+        with self._lock:
+            return self._tarefas.get(id)
+
+    def listar(self) -> List[TarefaLote]:
+        with self._lock:
+            return list(self._tarefas.values())
+
+    def cancelar(self, id: str) -> bool:
+        """Pede o cancelamento da tarefa. Retorna False se ela não existe ou já terminou."""
+        tarefa = self.obter(id)
+        if tarefa is None or not tarefa.ativa:
+            return False
+        tarefa.cancelar()
+        return True
+
+    def remover(self, id: str) -> None:
+        """Esquece uma tarefa finalizada, liberando os resultados da memória."""
+        with self._lock:
+            tarefa = self._tarefas.get(id)
+            if tarefa is not None and not tarefa.ativa:
+                del self._tarefas[id]
+
+    def close(self, cancelar: bool = True) -> None:
+        """Encerra o pool de threads, cancelando (por padrão) as tarefas ainda ativas."""
+        if cancelar:
+            for tarefa in self.listar():
+                tarefa.cancelar()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _executar(self, tarefa: TarefaLote, consulta: CNPJaLoteConsulta, cnpjs: List[str], kwargs: dict) -> None:
+        if tarefa.cancelamento_solicitado():
+            # Cancelada enquanto aguardava na fila: nada foi consultado
+            tarefa.resultado = LoteResultado()
+            tarefa.estado = "cancelada"
+            tarefa.finalizada = time.time()
+            return
+
+        tarefa.estado = "executando"
+        tarefa.iniciada = time.time()
+        try:
+            tarefa.resultado = consulta.consultar_lote(
+                cnpjs,
+                on_progress=tarefa._atualizar_progresso,
+                check_cancel=tarefa.cancelamento_solicitado,
+                **kwargs
+            )
+        except Exception as e:
+            tarefa.erro = str(e)
+            tarefa.estado = "erro"
+        else:
+            tarefa.estado = "cancelada" if tarefa.cancelamento_solicitado() else "concluida"
+        finally:
+            tarefa.tempo_restante = None
+            tarefa.finalizada = time.time()
+
+    def _descartar_antigas(self) -> None:
+        finalizadas = [id for id, tarefa in self._tarefas.items() if not tarefa.ativa]
+        for id in finalizadas[:max(0, len(finalizadas) - self.max_historico)]:
+            del self._tarefas[id]
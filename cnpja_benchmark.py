@@ -0,0 +1,155 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from cnpja_api.cnpja_api import CNPJaAPI
+from cnpja_api.cnpja_entrada import PESOS_DV1, PESOS_DV2
+from cnpja_api.cnpja_exportacao import FORMATOS
+from cnpja_api.cnpja_lote_consulta import CNPJaLoteConsulta
+from cnpja_api.cnpja_metricas import Metricas
+from cnpja_api.cnpja_servidor_simulado import ServidorSimulado
+
+try:
+    import resource
+except ImportError:
+    # Indisponível no Windows: o pico de memória não é informado
+    resource = None
+
+
+def gerar_cnpjs(quantidade: int, inicio: int = 1) -> list:
+    """CNPJs sintéticos válidos (matriz 0001, dígitos verificadores calculados)."""
+    bases = np.arange(inicio, inicio + quantidade, dtype=np.int64)
+    digitos = np.zeros((quantidade, 14), dtype=np.int64)
+    for posicao in range(8):
+        digitos[:, 7 - posicao] = (bases // 10 ** posicao) % 10
+    digitos[:, 11] = 1
+
+    resto1 = (digitos[:, :12] @ PESOS_DV1) % 11
+    digitos[:, 12] = np.where(resto1 < 2, 0, 11 - resto1)
+    resto2 = (digitos[:, :13] @ PESOS_DV2) % 11
+    digitos[:, 13] = np.where(resto2 < 2, 0, 11 - resto2)
+
+    texto = (digitos + 48).astype(np.uint8).tobytes().decode("ascii")
+    return [texto[i:i + 14] for i in range(0, len(texto), 14)]
+
+
+def pico_memoria_mb() -> float:
+    """Pico de memória residente do processo (desde o início), em MB."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB e macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def executar_cenario(url: str, quantidade: int, args) -> dict:
+    latencias = []
+    lock = threading.Lock()
+
+    def coletar(evento):
+        if evento["tipo"] == "requisicao":
+            with lock:
+                latencias.append(evento["latencia"])
+
+    metricas = Metricas()
+    metricas.assinar(coletar)
+    api = CNPJaAPI(
+        "benchmark", base_url=url, tamanho_pool=args.concorrencia, metricas=metricas,
+        backoff_base=0.05, backoff_maximo=1.0,
+    )
+    consulta = CNPJaLoteConsulta(api, consultas_por_minuto=args.consultas_por_minuto)
+    cnpjs = gerar_cnpjs(quantidade)
+
+    inicio = time.perf_counter()
+    resultado = consulta.consultar_lote(
+        cnpjs,
+        concorrencia=args.concorrencia,
+        verificar_simples=args.simples,
+        verificar_contribuintes=args.contribuintes,
+    )
+    tempo_lote = time.perf_counter() - inicio
+
+    tempos_exportacao = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        for formato in args.formatos:
+            destino = os.path.join(diretorio, "exportacao.xlsx" if formato == "xlsx" else formato)
+            inicio = time.perf_counter()
+            consulta.exportar(resultado, destino, formato)
+            tempos_exportacao[formato] = time.perf_counter() - inicio
+    api.close()
+
+    resumo = metricas.resumo()["endpoints"]
+    requisicoes = sum(dados["requisicoes"] for dados in resumo.values())
+    return {
+        "cnpjs": quantidade,
+        "registros": len(resultado),
+        "tempo_lote": tempo_lote,
+        "cnpjs_por_segundo": quantidade / tempo_lote,
+        "requisicoes_por_segundo": requisicoes / tempo_lote,
+        "novas_tentativas": sum(dados["novas_tentativas"] for dados in resumo.values()),
+        "erros": len(resultado.dataframe("999")) if "999" in resultado.regs else 0,
+        "latencia_p50": float(np.percentile(latencias, 50)) if latencias else None,
+        "latencia_p99": float(np.percentile(latencias, 99)) if latencias else None,
+        "exportacao": tempos_exportacao,
+        "pico_memoria_mb": pico_memoria_mb(),
+    }
+
+
+def imprimir(resultado: dict) -> None:
+    def ms(valor):
+        return f"{valor * 1000:.1f} ms" if valor is not None else "-"
+
+    print(f"\n== {resultado['cnpjs']:,} CNPJs ==")
+    print(f"  lote: {resultado['tempo_lote']:.2f} s | {resultado['cnpjs_por_segundo']:.1f} CNPJs/s"
+          f" | {resultado['requisicoes_por_segundo']:.1f} req/s")
+    print(f"  latência p50: {ms(resultado['latencia_p50'])} | p99: {ms(resultado['latencia_p99'])}")
+    print(f"  novas tentativas: {resultado['novas_tentativas']} | REG 999: {resultado['erros']}"
+          f" | registros: {resultado['registros']:,}")
+    for formato, tempo in resultado["exportacao"].items():
+        print(f"  exportação {formato}: {tempo:.2f} s")
+    if resultado["pico_memoria_mb"] is not None:
+        print(f"  pico de memória (RSS): {resultado['pico_memoria_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede a vazão do CNPJaLoteConsulta e dos exportadores contra um servidor local simulado."
+    )
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000],
+                        help="Quantidades de CNPJs de cada cenário (ex: 1000 100000 1000000)")
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--consultas-por-minuto", type=int, default=1_000_000,
+                        help="Limite do limitador de taxa (padrão: praticamente sem limite)")
+    parser.add_argument("--simples", action="store_true", help="Inclui Simples Nacional (REG 900)")
+    parser.add_argument("--contribuintes", action="store_true", help="Inclui inscrições estaduais (REG 800)")
+    parser.add_argument("--formatos", nargs="*", default=["csv"], choices=FORMATOS)
+    parser.add_argument("--url", help="Servidor simulado já em execução (ex: python -m cnpja_api.cnpja_servidor_simulado)")
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latência média do servidor local (segundos)")
+    parser.add_argument("--variacao-latencia", type=float, default=0.01)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Fração de respostas 503")
+    parser.add_argument("--taxa-limite", type=float, default=0.0, help="Fração de respostas 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After das respostas 429 (segundos)")
+    parser.add_argument("--gravacoes", help="Diretório com respostas gravadas ({cnpj}.json)")
+    args = parser.parse_args()
+
+    servidor = None
+    url = args.url
+    if url is None:
+        # No mesmo processo o servidor divide a CPU com o cliente; use --url para isolá-lo
+        servidor = ServidorSimulado(
+            latencia=args.latencia, variacao_latencia=args.variacao_latencia, taxa_erro=args.taxa_erro,
+            taxa_limite=args.taxa_limite, retry_after=args.retry_after, gravacoes=args.gravacoes, semente=42,
+        ).iniciar()
+        url = servidor.url
+
+    try:
+        for quantidade in args.tamanhos:
+            imprimir(executar_cenario(url, quantidade, args))
+    finally:
+        if servidor:
+            servidor.close()
@@ -1,10 +1,13 @@
 import streamlit as st
 from streamlit.errors import StreamlitSecretNotFoundError
-import pandas as pd
+import io
 import os
 import math
+import time
 from cnpja_api.cnpja_api import CNPJaAPI
 from cnpja_api.cnpja_lote_consulta import CNPJaLoteConsulta
+from cnpja_api.cnpja_cache import CacheRespostas
+from cnpja_api.cnpja_tarefas import GerenciadorTarefas
 
 try:
     CNPJA_API_KEY = st.secrets["CNPJA_API_KEY"]
@@ -18,13 +21,6 @@ except (StreamlitSecretNotFoundError):
 if not CNPJA_API_KEY:
     raise ValueError("A chave da API (CNPJA_API_KEY) não foi definida.")
 
-if "cancelar_consulta" not in st.session_state:
-    st.session_state.cancelar_consulta = False
-if "consulta_em_andamento" not in st.session_state:
-    st.session_state.consulta_em_andamento = False
-if "resultado" not in st.session_state:
-    st.session_state.resultado = None
-
 st.set_page_config(page_title="Consulta CNPJ em Lote", layout="wide")
 
 st.title("🔎 Consulta e Exportação de CNPJs - CNPJa API")
@@ -45,100 +41,92 @@ exibir_qsa = st.checkbox("Mostrar QSA (Quadro de Sócios e Administradores)", va
 exibir_simples = st.checkbox("Verificar Simples Nacional", value=False)
 exibir_contribuintes = st.checkbox("Consultar Cadastro de Contribuintes (Inscrições Estaduais)", value=False)
 
-api = CNPJaAPI(CNPJA_API_KEY)  
-cliente = CNPJaLoteConsulta(api, consultas_por_minuto=consultas_por_minuto)
+# Cache de respostas compartilhado entre todas as sessões do app
+@st.cache_resource
+def obter_cache():
+    return CacheRespostas("cnpja_cache.sqlite")
+
+# Cliente e gerenciador de lotes únicos no processo: os lotes rodam em segundo plano,
+# continuam após recarregar a página e vários analistas podem consultar ao mesmo tempo
+@st.cache_resource
+def obter_cliente(consultas_por_minuto):
+    api = CNPJaAPI(CNPJA_API_KEY, cache=obter_cache())
+    return CNPJaLoteConsulta(api, consultas_por_minuto=consultas_por_minuto)
+
+@st.cache_resource
+def obter_gerenciador():
+    return GerenciadorTarefas()
+
+cliente = obter_cliente(consultas_por_minuto)
+gerenciador = obter_gerenciador()
 
 # Botão de consulta
-if st.button("Consultar CNPJs"):    
-    st.session_state.iniciar_consulta = True
-    st.session_state.consulta_em_andamento = True
-    st.session_state.cancelar_consulta = False
-    
-if st.session_state.get("iniciar_consulta", False):
+if st.button("Consultar CNPJs"):
     cnpjs = [cnpj.strip() for cnpj in cnpj_input.splitlines() if cnpj.strip()]
-    
     if not cnpjs:
         st.warning("⚠️ Informe ao menos um CNPJ válido.")
-        st.session_state.iniciar_consulta = False
-        st.session_state.consulta_em_andamento = False
     else:
-        with st.spinner("Preparando consulta..."):
-                        
-            progresso = st.progress(0)
-            status_text = st.empty()
-            
-            def verificar_cancelamento():
-                return st.session_state.cancelar_consulta
-            
-            def atualizar_progresso(atual, total, tempo_restante=None):
-                progresso.progress(atual / total)
-                if tempo_restante:
-                    minutos = math.ceil(tempo_restante / 60)
-                    status_text.text(f"Consultando {atual} de {total} CNPJs... ⏳ ~{minutos} min restantes")
-                else:
-                    status_text.text(f"Consultando {atual} de {total} CNPJs...")
-
-            cancelar_placeholder = st.empty()
-            def render_cancelar():
-                if cancelar_placeholder.button("❌ Cancelar Consulta"):
-                    st.session_state.cancelar_consulta = True
-            render_cancelar()
-
-            st.session_state.resultado = cliente.consultar_lote(
-                cnpjs, 
-                on_progress=atualizar_progresso,
-                check_cancel=verificar_cancelamento,
-                verificar_simples=exibir_simples,
-                verificar_contribuintes=exibir_contribuintes
-            )
-            
-            # Reseta flags
-            st.session_state.iniciar_consulta = False
-            st.session_state.consulta_em_andamento = False
-            cancelar_placeholder.empty() 
-            
-            if st.session_state.cancelar_consulta:
-                st.warning("Consulta cancelada pelo usuário. Resultados parciais exibidos abaixo.")
-            else:
-                status_text.text(f"Resultados prontos! Mosntrando CNPJs consultados.")
-
-if st.session_state.resultado:
+        # O id da tarefa fica na URL para que a página recarregada volte a acompanhar o mesmo lote
+        st.query_params["tarefa"] = gerenciador.iniciar(
+            cliente,
+            cnpjs,
+            verificar_simples=exibir_simples,
+            verificar_contribuintes=exibir_contribuintes
+        )
+
+tarefa = gerenciador.obter(st.query_params["tarefa"]) if "tarefa" in st.query_params else None
+if "tarefa" in st.query_params and tarefa is None:
+    st.warning("Consulta não encontrada. Ela pode ter sido descartada ou o servidor foi reiniciado.")
+    del st.query_params["tarefa"]
+
+if tarefa is not None and tarefa.ativa:
+    st.progress(tarefa.progresso)
+    if tarefa.estado == "pendente":
+        st.text("Aguardando outras consultas em andamento...")
+    elif tarefa.tempo_restante:
+        minutos = math.ceil(tarefa.tempo_restante / 60)
+        st.text(f"Consultando {tarefa.concluidos} de {tarefa.total} CNPJs... ⏳ ~{minutos} min restantes")
+    else:
+        st.text(f"Consultando {tarefa.concluidos} de {tarefa.total} CNPJs...")
+
+    if tarefa.cancelamento_solicitado():
+        st.text("Cancelando consulta...")
+    elif st.button("❌ Cancelar Consulta"):
+        gerenciador.cancelar(tarefa.id)
+
+    # Acompanha o progresso relendo a tarefa a cada segundo
+    time.sleep(1)
+    st.rerun()
+
+if tarefa is not None and tarefa.estado == "erro":
+    st.error(f"Falha na consulta: {tarefa.erro}")
+elif tarefa is not None and tarefa.estado == "cancelada":
+    st.warning("Consulta cancelada pelo usuário. Resultados parciais exibidos abaixo.")
+
+if tarefa is not None and tarefa.resultado:
     with st.spinner("Processando resultado..."):
-        # Organiza por REG para exportação e exibição
-        df = pd.DataFrame(st.session_state.resultado)
-        
-        if "001" in df["REG"].values:
-            st.subheader("📋 Dados Cadastrais (REG 001)")
-            st.dataframe(df[df["REG"] == "001"].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna(""))
-
-        if "002" in df["REG"].values and exibir_cnae:
-            st.subheader("🏷️ CNAEs (REG 002)")
-            st.dataframe(df[df["REG"] == "002"].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna(""))
-            
-        if "003" in df["REG"].values and exibir_qsa:
-            st.subheader("🧑‍💼 QSA (REG 003)")
-            st.dataframe(df[df["REG"] == "003"].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna(""))
-
-        if "900" in df["REG"].values and exibir_simples:
-            st.subheader("🏢 Simples Nacional (REG 900)")
-            st.dataframe(df[df["REG"] == "900"].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna(""))
-
-        if "800" in df["REG"].values and exibir_contribuintes:
-            st.subheader("📋 Cadastro de Contribuintes (REG 800)")
-            st.dataframe(df[df["REG"] == "800"].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna(""))
-
-        if "999" in df["REG"].values:
-            st.subheader("❌ Erros de Consulta (REG 999)")
-            st.dataframe(df[df["REG"] == "999"].reset_index(drop=True).dropna(axis=1, how="all").infer_objects(copy=False).fillna(""))
-
-        # Exportação
-        caminho_excel = "exportacao_consulta_cnpjs.xlsx"
-        cliente.exportar_para_excel(st.session_state.resultado, caminho_excel)
-
-        with open(caminho_excel, "rb") as f:
-            st.download_button(
-                label="⬇️ Baixar Resultado em Excel",
-                data=f,
-                file_name="exportacao_consulta_cnpjs.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        # Resultado já separado por REG: cada DataFrame é montado uma única vez e reaproveitado nos reruns
+        resultado = tarefa.resultado
+        secoes = [
+            ("001", "📋 Dados Cadastrais (REG 001)", True),
+            ("002", "🏷️ CNAEs (REG 002)", exibir_cnae),
+            ("003", "🧑‍💼 QSA (REG 003)", exibir_qsa),
+            ("900", "🏢 Simples Nacional (REG 900)", exibir_simples),
+            ("800", "📋 Cadastro de Contribuintes (REG 800)", exibir_contribuintes),
+            ("999", "❌ Erros de Consulta (REG 999)", True),
+        ]
+        for reg, titulo, exibir in secoes:
+            if reg in resultado.regs and exibir:
+                st.subheader(titulo)
+                st.dataframe(resultado.dataframe(reg))
+
+        # Exportação em memória: sessões diferentes não disputam o mesmo arquivo
+        arquivo_excel = io.BytesIO()
+        cliente.exportar_para_excel(resultado, arquivo_excel)
+
+        st.download_button(
+            label="⬇️ Baixar Resultado em Excel",
+            data=arquivo_excel.getvalue(),
+            file_name="exportacao_consulta_cnpjs.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
@@ -0,0 +1,92 @@
+import threading
+import unittest
+
+from cnpja_api.cnpja_agrupador import AgrupadorRequisicoes
+
+
+class TestAgrupadorRequisicoes(unittest.TestCase):
+    AGUARDANDO = 5
+    TIMEOUT = 5
+
+    def setUp(self):
+        self.agrupador = AgrupadorRequisicoes()
+        self.iniciou = threading.Event()
+        self.liberar = threading.Event()
+        self.agrupadas = threading.Semaphore(0)
+        self.chamadas = 0
+
+    def requisicao(self, resultado=None, erro: Exception = None):
+        """Função do líder: espera as demais chamadas se juntarem antes de concluir."""
+        def funcao():
+            self.chamadas += 1
+            self.iniciou.set()
+            self.assertTrue(self.liberar.wait(self.TIMEOUT))
+            if erro is not None:
+                raise erro
+            return resultado
+        return funcao
+
+    def executar_agrupadas(self, funcao) -> list:
+        """Executa um líder e AGUARDANDO chamadas agrupadas; retorna (resultado | exceção) de cada uma."""
+        saidas = [None] * (self.AGUARDANDO + 1)
+
+        def chamar(indice):
+            try:
+                saidas[indice] = self.agrupador.executar("chave", funcao, ao_agrupar=self.agrupadas.release)
+            except Exception as e:
+                saidas[indice] = e
+
+        threads = [threading.Thread(target=chamar, args=(0,))]
+        threads[0].start()
+        self.assertTrue(self.iniciou.wait(self.TIMEOUT))
+        for indice in range(1, self.AGUARDANDO + 1):
+            threads.append(threading.Thread(target=chamar, args=(indice,)))
+            threads[-1].start()
+        for _ in range(self.AGUARDANDO):
+            self.assertTrue(self.agrupadas.acquire(timeout=self.TIMEOUT))
+        self.liberar.set()
+        for thread in threads:
+            thread.join(self.TIMEOUT)
+        return saidas
+
+    def test_uma_requisicao_para_chamadas_simultaneas(self):
+        saidas = self.executar_agrupadas(self.requisicao({"taxId": "1"}))
+        self.assertEqual(self.chamadas, 1)
+        self.assertEqual(saidas, [{"taxId": "1"}] * (self.AGUARDANDO + 1))
+        self.assertEqual(self.agrupador.em_andamento(), 0)
+
+    def test_cada_chamada_recebe_copia_independente(self):
+        resultado = {"taxId": "1", "company": {"members": []}}
+        saidas = self.executar_agrupadas(self.requisicao(resultado))
+        self.assertEqual(len({id(saida) for saida in saidas}), len(saidas))
+        self.assertFalse(any(saida is resultado for saida in saidas))
+        saidas[0]["company"]["members"].append("alterado")
+        saidas[1]["taxId"] = "alterado"
+        for saida in saidas[2:]:
+            self.assertEqual(saida, {"taxId": "1", "company": {"members": []}})
+
+    def test_excecao_chega_a_todas_as_chamadas(self):
+        erro = ValueError("falha")
+        saidas = self.executar_agrupadas(self.requisicao(erro=erro))
+        self.assertEqual(self.chamadas, 1)
+        for saida in saidas:
+            self.assertIs(saida, erro)
+        self.assertEqual(self.agrupador.em_andamento(), 0)
+
+    def test_chamada_isolada_recebe_o_proprio_resultado(self):
+        resultado = {"taxId": "1"}
+        self.assertIs(self.agrupador.executar("chave", lambda: resultado), resultado)
+
+    def test_nada_e_guardado_apos_conclusao(self):
+        self.agrupador.executar("chave", lambda: 1)
+        self.assertEqual(self.agrupador.executar("chave", lambda: 2), 2)
+
+    def test_chaves_diferentes_nao_sao_agrupadas(self):
+        self.liberar.set()
+        self.assertEqual(self.agrupador.executar("a", self.requisicao(1)), 1)
+        self.assertEqual(self.agrupador.executar("b", self.requisicao(2)), 2)
+        self.assertEqual(self.chamadas, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
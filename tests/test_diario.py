@@ -0,0 +1,98 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from cnpja_api.cnpja_diario import DiarioLote
+
+
+class TestDiarioLote(unittest.TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.caminho = os.path.join(diretorio.name, "lote.jsonl.gz")
+
+    def gravar(self, *cnpjs: str) -> None:
+        with DiarioLote(self.caminho) as diario:
+            for cnpj in cnpjs:
+                diario.registrar(cnpj, {"taxId": cnpj})
+
+    def cnpjs(self) -> list:
+        return [entrada["cnpj"] for entrada in DiarioLote(self.caminho).ler()]
+
+    def gravar_com_queda(self, *cnpjs: str, cortar: int = 0) -> None:
+        """Simula uma queda: as linhas são gravadas (flush), mas o membro gzip fica sem trailer."""
+        diario = DiarioLote(self.caminho)
+        for cnpj in cnpjs:
+            diario.registrar(cnpj, {"taxId": cnpj})
+        with open(self.caminho, "rb") as arquivo:
+            conteudo = arquivo.read()
+        diario.close()
+        with open(self.caminho, "wb") as arquivo:
+            arquivo.write(conteudo[:len(conteudo) - cortar])
+
+    def test_le_entradas_na_ordem_de_gravacao(self):
+        self.gravar("1", "2")
+        self.gravar("3")
+        self.assertEqual(self.cnpjs(), ["1", "2", "3"])
+
+    def test_respostas_reconstroem_argumentos(self):
+        with DiarioLote(self.caminho) as diario:
+            diario.registrar("1", {"taxId": "1"}, dados_simples={"simples": {"optant": True}},
+                             dados_contribuintes=ValueError("falhou"),
+                             verificar_simples=True, verificar_contribuintes=True)
+        dados, simples, contribuintes, verificou_simples, verificou_contribuintes = \
+            DiarioLote.respostas(next(DiarioLote(self.caminho).ler()))
+        self.assertEqual(dados, {"taxId": "1"})
+        self.assertEqual(simples, {"simples": {"optant": True}})
+        self.assertIsInstance(contribuintes, Exception)
+        self.assertEqual(str(contribuintes), "falhou")
+        self.assertTrue(verificou_simples and verificou_contribuintes)
+
+    def test_sucesso_nao_e_substituido_por_falha(self):
+        with DiarioLote(self.caminho) as diario:
+            diario.registrar("1", erro=RuntimeError("timeout"))
+            diario.registrar("1", {"taxId": "1"})
+            diario.registrar("1", erro=RuntimeError("timeout"))
+            diario.registrar("2", erro=RuntimeError("timeout"))
+        self.assertEqual(DiarioLote(self.caminho).concluidos(), {"1"})
+
+    def test_membro_sem_trailer_e_lido(self):
+        self.gravar("1", "2")
+        self.gravar_com_queda("3", "4")
+        self.assertEqual(self.cnpjs(), ["1", "2", "3", "4"])
+
+    def test_acrescenta_depois_de_membro_truncado(self):
+        self.gravar("1", "2")
+        self.gravar_com_queda("3", "4")
+        self.gravar("5")
+        self.assertEqual(self.cnpjs(), ["1", "2", "3", "4", "5"])
+        # Reparado antes de acrescentar: o arquivo volta a ser um gzip válido
+        with gzip.open(self.caminho, "rt", encoding="utf-8") as arquivo:
+            self.assertEqual(len(arquivo.readlines()), 5)
+
+    def test_linha_parcial_e_descartada(self):
+        self.gravar("1", "2")
+        self.gravar_com_queda(*map(str, range(3, 50)), cortar=40)
+        lidos = self.cnpjs()
+        self.assertEqual(lidos, [str(i) for i in range(1, len(lidos) + 1)])
+        self.assertLess(len(lidos), 49)
+        self.gravar("99")
+        self.assertEqual(self.cnpjs(), lidos + ["99"])
+
+    def test_trecho_corrompido_entre_membros(self):
+        self.gravar("1")
+        with open(self.caminho, "ab") as arquivo:
+            arquivo.write(DiarioLote.MAGICA_GZIP + b"\x00" * 32)
+        self.gravar("2")
+        self.assertEqual(self.cnpjs(), ["1", "2"])
+
+    def test_arquivo_inexistente_ou_vazio(self):
+        self.assertEqual(self.cnpjs(), [])
+        open(self.caminho, "wb").close()
+        self.assertEqual(self.cnpjs(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
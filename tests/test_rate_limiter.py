@@ -0,0 +1,97 @@
+import unittest
+from unittest import mock
+
+from cnpja_api import cnpja_rate_limiter
+from cnpja_api.cnpja_rate_limiter import LimitadorTaxa
+
+
+class RelogioFalso:
+    """Substitui time.monotonic/time.sleep: o tempo só avança nas esperas."""
+
+    def __init__(self, agora: float = 1000.0):
+        self.agora = agora
+
+    def monotonic(self) -> float:
+        return self.agora
+
+    def sleep(self, segundos: float) -> None:
+        self.agora += segundos
+
+
+class TestLimitadorTaxa(unittest.TestCase):
+
+    def setUp(self):
+        self.relogio = RelogioFalso()
+        patcher = mock.patch.object(cnpja_rate_limiter, "time", self.relogio)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def adquirir(self, limitador: LimitadorTaxa, quantidade: int) -> list:
+        """Horários em que cada requisição foi liberada."""
+        horarios = []
+        for _ in range(quantidade):
+            limitador.adquirir()
+            horarios.append(self.relogio.agora)
+        return horarios
+
+    def assertJanelaRespeitada(self, horarios: list, por_minuto: int):
+        for i, inicio in enumerate(horarios):
+            na_janela = sum(1 for horario in horarios[i:] if horario < inicio + LimitadorTaxa.JANELA)
+            self.assertLessEqual(na_janela, por_minuto, f"janela iniciada em {inicio}")
+
+    def test_rajada_inicial_sem_espera(self):
+        limitador = LimitadorTaxa(60, rajada=5)
+        horarios = self.adquirir(limitador, 5)
+        self.assertEqual(horarios, [1000.0] * 5)
+        self.assertGreater(limitador.tempo_espera(), 0)
+
+    def test_no_maximo_por_minuto_em_qualquer_janela(self):
+        limitador = LimitadorTaxa(60, rajada=30)
+        horarios = self.adquirir(limitador, 200)
+        self.assertJanelaRespeitada(horarios, 60)
+
+    def test_janela_respeitada_apos_periodos_ociosos(self):
+        # Após cada pausa a rajada está cheia de novo; somada à reposição passaria do limite
+        limitador = LimitadorTaxa(20, rajada=20)
+        horarios = []
+        for _ in range(5):
+            horarios += self.adquirir(limitador, 30)
+            self.relogio.sleep(45)
+        self.assertJanelaRespeitada(horarios, 20)
+
+    def test_ajustar_limite_reduz_a_cota(self):
+        limitador = LimitadorTaxa(60)
+        self.adquirir(limitador, 10)
+        limitador.ajustar_limite(10)
+        horarios = self.adquirir(limitador, 40)
+        self.assertJanelaRespeitada(horarios, 10)
+
+    def test_penalizar_suspende_reposicao_durante_retry_after(self):
+        limitador = LimitadorTaxa(60, rajada=5)
+        limitador.penalizar(retry_after=10)
+        self.assertEqual(limitador.taxa_atual, 30)
+        inicio = self.relogio.agora
+        limitador.adquirir()
+        self.assertGreaterEqual(self.relogio.agora - inicio, 10)
+
+    def test_penalizacoes_respeitam_taxa_minima(self):
+        limitador = LimitadorTaxa(60)
+        for _ in range(20):
+            limitador.penalizar(retry_after=0)
+        self.assertAlmostEqual(limitador.taxa_atual, 60 * LimitadorTaxa.TAXA_MINIMA)
+
+    def test_sucessos_recuperam_a_taxa(self):
+        limitador = LimitadorTaxa(60)
+        limitador.penalizar(retry_after=0)
+        for _ in range(9):
+            limitador.registrar_sucesso()
+        self.assertLess(limitador.taxa_atual, 60)
+        limitador.registrar_sucesso()
+        self.assertAlmostEqual(limitador.taxa_atual, 60)
+        for _ in range(5):
+            limitador.registrar_sucesso()
+        self.assertAlmostEqual(limitador.taxa_atual, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()